@@ -0,0 +1,103 @@
+// Spielseiten: Preisverlauf-Chart, mobile Kaufleiste und Preisindikator.
+window.addEventListener('DOMContentLoaded', function(){
+  const ctx = document.getElementById('priceHistoryChart');
+  let hist=[];
+  try{hist=JSON.parse((ctx&&ctx.dataset.history)||'[]');}catch(e){hist=[];}
+  if(hist.length && window.Chart){
+    const labels = hist.map(r=>r.date);
+    const data = hist.map(r=>r.min);
+    new Chart(ctx,{type:'line',data:{labels:labels,datasets:[{label:'Preis',data:data,borderColor:'#3e95cd',fill:false}]},options:{plugins:{legend:{display:false}},scales:{y:{ticks:{callback:(v)=>v+' €'}}}}});
+  }
+
+  var moreBtn=document.getElementById('moreOffersBtn');
+  if(moreBtn){
+    moreBtn.addEventListener('click',function(){
+      document.querySelectorAll('.offer-row.extra').forEach(function(el){
+        el.style.removeProperty('display');
+      });
+      moreBtn.remove();
+    });
+  }
+  var sticky=document.getElementById('stickyBuyBar');
+  var dealBtn=document.getElementById('dealBtn');
+  if(sticky && dealBtn && window.matchMedia('(max-width:719px)').matches){
+    var stickyBtn=dealBtn.cloneNode(true);
+    stickyBtn.id='stickyDealBtn';
+    sticky.appendChild(stickyBtn);
+    var observer=new IntersectionObserver(function(entries){
+      entries.forEach(function(entry){
+        sticky.classList.toggle('show', !entry.isIntersecting);
+      });
+    });
+    observer.observe(dealBtn);
+  }
+
+  var priceHistory=document.querySelector('.price-history');
+  var priceIndicator=document.querySelector('.bpr-price-indicator');
+  if(priceHistory && priceIndicator && window.matchMedia('(max-width:719px)').matches){
+    priceIndicator.insertAdjacentElement('afterend', priceHistory);
+  }
+});
+
+(function(){
+  const el=document.querySelector('#preisindikator');
+  if(!el) return;
+  const currency=el.dataset.currency||'EUR';
+  const name=el.dataset.productName||document.querySelector('h1')?.textContent?.trim()||'Produkt';
+  const url=el.dataset.productUrl||location.href;
+  const image=el.dataset.productImage||'';
+  const offerUrl=el.dataset.offerUrl||'#';
+  const availability=el.dataset.availability||'InStock';
+  const cur=Number(el.dataset.current||0);
+  const avg7=Number(el.dataset.sevenDayAverage||0);
+  let history=[];
+  try{history=JSON.parse(el.dataset.history||'[]');}catch(e){history=[];}
+  if(history.length&&typeof history[0]==='object'){history=history.map(h=>h.min);}
+  const nf=new Intl.NumberFormat('de-DE',{style:'currency',currency});
+  const pctf=new Intl.NumberFormat('de-DE',{maximumFractionDigits:1,minimumFractionDigits:1});
+  const low30=history.length?Math.min(...history):Math.min(cur,avg7||cur);
+  const high30=history.length?Math.max(...history):Math.max(cur,avg7||cur);
+  const delta=avg7?((cur-avg7)/avg7):0;
+  const isLow30=history.length>0 && cur<=low30+0.001;
+  let statusLabel='OK';
+  let statusTone='ok';
+  if(delta<=-0.10){statusLabel='Top‑Deal';statusTone='good';}
+  else if(isLow30){statusLabel='Gut';statusTone='good';}
+  else if(delta<=-0.03){statusLabel='Gut';statusTone='good';}
+  else if(Math.abs(delta)<=0.03){statusLabel='OK';statusTone='ok';}
+  else{statusLabel='Hoch';statusTone='high';}
+  el.querySelectorAll('[data-field="current"]').forEach(n=>n.textContent=nf.format(cur));
+  const avgEl=el.querySelector('[data-field="avg7"]');if(avgEl)avgEl.textContent=nf.format(avg7||cur);
+  el.querySelectorAll('[data-field="low30"]').forEach(n=>n.textContent=nf.format(low30));
+  el.querySelectorAll('[data-field="high30"]').forEach(n=>n.textContent=nf.format(high30));
+  const deltaEl=el.querySelector('[data-field="delta"]');
+  if(deltaEl){const sign=delta>0?'+':'';deltaEl.textContent=`${sign}${pctf.format(delta*100)} vs. 7‑Tage‑Ø`;}
+  const pill=el.querySelector('.bpr-pill');
+  if(pill){
+    const dot=pill.querySelector('.bpr-pill__dot');
+    const lab=pill.querySelector('.bpr-pill__label');
+    if(dot) dot.style.background=statusTone==='good'?'var(--bpr-good)':statusTone==='ok'?'var(--bpr-ok)':'var(--bpr-high)';
+    if(lab) lab.textContent=statusLabel;
+  }
+  const gaugeFill=el.querySelector('.bpr-gauge__fill');
+  const gaugeMarker=el.querySelector('.bpr-gauge__marker');
+  const range=Math.max(0.01,high30-low30);
+  const pct=Math.max(0,Math.min(1,(cur-low30)/range));
+  const pctMid=avg7?Math.max(0,Math.min(1,(avg7-low30)/range)):0.5;
+  if(gaugeFill) gaugeFill.style.width=`${pct*100}%`;
+  if(gaugeMarker) gaugeMarker.style.left=`${pct*100}%`;
+  const mid=el.querySelector('.bpr-gauge__mid');
+  if(mid) mid.style.transform=`translateX(${(pctMid*100-50)*.2}%)`;
+  const jsonld={
+    '@context':'https://schema.org',
+    '@type':'Product',
+    name:name,
+    image:image?[image]:undefined,
+    url:url,
+    offers:{'@type':'Offer',url:offerUrl||url,priceCurrency:currency,price:cur.toFixed(2),availability:`https://schema.org/${availability}`}
+  };
+  const s=document.createElement('script');
+  s.type='application/ld+json';
+  s.textContent=JSON.stringify(jsonld);
+  document.head.appendChild(s);
+})();
@@ -20,55 +20,150 @@
     });
   }
 
-  // Suche & Filter
+  // Suche & Filter über den vorab gebauten Suchindex (search-index.<hash>.json)
   var q = document.getElementById('q');
   var list = document.querySelector('[data-list]');
   var pFilter = document.getElementById('filter-players');
   var aFilter = document.getElementById('filter-age');
   var tFilter = document.getElementById('filter-theme');
+  var indexLink = document.getElementById('search-index');
+  var countEl = document.querySelector('[data-count]');
+  var moreBtn = document.querySelector('[data-more]');
+  var pager = document.querySelector('[data-pager]');
+  var pageItems = list ? Array.prototype.slice.call(list.children) : [];
+  var WINDOW = 50;
+  var MIN_INFIX = 3;
+  var index = null, tokenKeys = null, titles = null, results = [], shown = 0;
 
-  function applyFilters(){
-    if (!list) return;
-    var term = q ? q.value.toLowerCase() : '';
-    var players = pFilter && pFilter.value ? parseInt(pFilter.value,10) : null;
-    var age = aFilter && aFilter.value ? parseInt(aFilter.value,10) : null;
+  function fold(text){
+    return text.toLowerCase()
+      .replace(/ä/g,'ae').replace(/ö/g,'oe').replace(/ü/g,'ue').replace(/ß/g,'ss')
+      .normalize('NFKD').replace(/[\u0300-\u036f]/g,'');
+  }
+
+  // Indizes aller Spiele mit einem Token, das mit `prefix` beginnt
+  function prefixMatches(prefix){
+    var lo = 0, hi = tokenKeys.length;
+    while (lo < hi){
+      var mid = (lo + hi) >> 1;
+      if (tokenKeys[mid] < prefix) lo = mid + 1; else hi = mid;
+    }
+    var ids = {};
+    for (var i = lo; i < tokenKeys.length && tokenKeys[i].lastIndexOf(prefix, 0) === 0; i++){
+      index.tokens[tokenKeys[i]].forEach(function(id){ ids[id] = true; });
+    }
+    return ids;
+  }
+
+  // Token-Präfixe aus dem Index, ab MIN_INFIX Zeichen auch Teilwörter im Titel
+  function termMatches(term){
+    var ids = prefixMatches(term);
+    if (term.length >= MIN_INFIX){
+      titles.forEach(function(title, id){ if (title.indexOf(term) !== -1) ids[id] = true; });
+    }
+    return ids;
+  }
+
+  function hasBit(bits, id){
+    return bits !== null && (bits[id >> 5] & (1 << (id & 31))) !== 0;
+  }
+
+  function search(){
+    var terms = q ? fold(q.value).split(/[^a-z0-9]+/).filter(Boolean) : [];
+    var masks = [];
+    var players = pFilter && pFilter.value ? parseInt(pFilter.value,10) : NaN;
+    var age = aFilter && aFilter.value ? parseInt(aFilter.value,10) : NaN;
     var theme = tFilter && tFilter.value ? tFilter.value : null;
-    list.querySelectorAll('li').forEach(function(li){
-      var textMatch = !term || li.textContent.toLowerCase().indexOf(term) !== -1;
-      var pMatch = true;
-      var aMatch = true;
-      var tMatch = true;
-      if (players !== null){
-        var min = parseInt(li.dataset.minPlayers,10);
-        var max = parseInt(li.dataset.maxPlayers,10);
-        if (!isNaN(min) && !isNaN(max)){
-          pMatch = players >= min && players <= max;
-        }else{
-          pMatch = false;
-        }
-      }
-      if (age !== null){
-        var gAge = parseInt(li.dataset.age,10);
-        if (!isNaN(gAge)){
-          aMatch = gAge <= age;
-        }else{
-          aMatch = false;
+    if (!isNaN(players)) masks.push(index.players[players] || null);
+    if (!isNaN(age)){
+      var ageBits = null;
+      index.ages.forEach(function(entry){ if (entry[0] <= age) ageBits = entry[1]; });
+      masks.push(ageBits);
+    }
+    if (theme) masks.push(index.themes[theme] || null);
+    if (!terms.length && !masks.length) return null;
+
+    var candidates = [];
+    if (terms.length){
+      var ids = termMatches(terms[0]);
+      terms.slice(1).forEach(function(term){
+        var next = termMatches(term);
+        Object.keys(ids).forEach(function(id){ if (!next[id]) delete ids[id]; });
+      });
+      candidates = Object.keys(ids).map(Number).sort(function(a,b){ return a - b; });
+    }else if (masks.every(Boolean)){
+      // Bitsets wortweise verknüpfen und nur gesetzte Bits aufzählen
+      for (var w = 0; w < masks[0].length; w++){
+        var word = masks[0][w];
+        for (var m = 1; m < masks.length; m++) word &= masks[m][w];
+        while (word){
+          var bit = 31 - Math.clz32(word & -word);
+          candidates.push(w * 32 + bit);
+          word &= word - 1;
         }
       }
-      if (theme){
-        var themes = li.dataset.themes ? li.dataset.themes.split(',') : [];
-        tMatch = themes.indexOf(theme) !== -1;
-      }
-      li.style.display = (textMatch && pMatch && aMatch && tMatch) ? '' : 'none';
+      return candidates;
+    }
+    return candidates.filter(function(id){
+      return masks.every(function(bits){ return hasBit(bits, id); });
     });
   }
-  [q, pFilter, aFilter, tFilter].forEach(function(el){
-    if (el){
-      el.addEventListener('input', applyFilters);
-      el.addEventListener('change', applyFilters);
+
+  function renderMore(){
+    var end = Math.min(shown + WINDOW, results.length);
+    var root = indexLink.href.replace(/[^\/]*$/, '');
+    var frag = document.createDocumentFragment();
+    for (; shown < end; shown++){
+      var game = index.games[results[shown]];
+      var li = document.createElement('li');
+      var a = document.createElement('a');
+      a.href = root + 'spiel/' + game[1] + '/';
+      a.textContent = game[0];
+      li.appendChild(a);
+      frag.appendChild(li);
     }
-  });
-  applyFilters();
+    list.appendChild(frag);
+    if (moreBtn) moreBtn.hidden = shown >= results.length;
+  }
+
+  function applyFilters(){
+    if (!list || !index) return;
+    var found = search();
+    list.textContent = '';
+    if (pager) pager.hidden = found !== null;
+    if (found === null){
+      // ohne Suche wieder die Spiele dieser Seite zeigen
+      pageItems.forEach(function(li){ list.appendChild(li); });
+      if (moreBtn) moreBtn.hidden = true;
+    }else{
+      results = found;
+      shown = 0;
+      renderMore();
+    }
+    if (countEl){
+      countEl.textContent = found === null ? '' :
+        (results.length === 1 ? '1 Spiel gefunden' : results.length + ' Spiele gefunden');
+    }
+  }
+
+  if (list && indexLink){
+    fetch(indexLink.href).then(function(r){ return r.json(); }).then(function(data){
+      index = data;
+      tokenKeys = Object.keys(index.tokens).sort();
+      titles = index.games.map(function(game){ return fold(game[0]); });
+      [q, pFilter, aFilter, tFilter].forEach(function(el){
+        if (el){
+          el.addEventListener('input', applyFilters);
+          el.addEventListener('change', applyFilters);
+        }
+      });
+      if (moreBtn) moreBtn.addEventListener('click', renderMore);
+      // Eingaben vor dem Laden des Index (oder nach „Zurück“) übernehmen
+      if ((q && q.value) || (pFilter && pFilter.value) || (aFilter && aFilter.value) || (tFilter && tFilter.value)){
+        applyFilters();
+      }
+    }).catch(function(){ /* ohne Index bleibt die vollständige Liste stehen */ });
+  }
 
   // Cookie Banner
   var banner = document.getElementById('cookie-banner');
@@ -1,7 +1,16 @@
-import os, json, pathlib, yaml, datetime as dt, xml.etree.ElementTree as ET, re, logging
+import os, json, pathlib, yaml, datetime as dt, re, logging
+import argparse, functools, gzip, hashlib, itertools, pickle, shutil, sqlite3, traceback, unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from urllib.parse import quote_plus
+from xml.sax.saxutils import escape
+import numpy as np
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+try:  # in requirements.txt; without it --precompress writes only .gz files
+    import brotli
+except ImportError:
+    brotli = None
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 CONTENT = ROOT / "content" / "games"
 DATA = ROOT / "data" / "offers"
@@ -11,6 +20,12 @@ TEMPLATES = ROOT / "templates"
 PUBLIC = ROOT / "public"
 DIST = ROOT / "dist"
 HUBS_CFG = ROOT / "content" / "hubs.yaml"
+MANIFEST_NAME = ".build-manifest.json"
+COMPRESS_MANIFEST_NAME = ".compress-manifest.json"
+COMPRESS_SUFFIXES = (".html", ".css", ".js", ".xml", ".json", ".svg")
+CATALOGUE_CACHE = ROOT / "data" / "cache" / "catalogue.pickle"
+HISTORY_DB = ROOT / "data" / "cache" / "history.sqlite"
+MODEL_PATH = ROOT / "data" / "relevance_model.pkl"
 
 LOG_DIR = ROOT / "data" / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -23,6 +38,8 @@ logging.basicConfig(
 EPN_CAMPAIGN_ID = os.getenv("EPN_CAMPAIGN_ID", "").strip()
 EPN_REFERENCE_ID = os.getenv("EPN_REFERENCE_ID", "preisradar").strip()
 AMAZON_PARTNER_ID = os.getenv("AMAZON_PARTNER_ID", "28310edf-21").strip()
+# Environment variables that end up in rendered pages
+BUILD_ENV_VARS = ("SITE_URL", "EPN_CAMPAIGN_ID", "EPN_REFERENCE_ID", "AMAZON_PARTNER_ID")
 
 # Load default filters (e.g. eBay category) from config
 FILTER_PATH = ROOT / "config" / "filters.yaml"
@@ -39,9 +56,24 @@ FILTER_CFG = load_filter_config(FILTER_PATH)
 DEFAULT_EBAY_CATEGORY_ID = str(
     FILTER_CFG.get("default_ebay_category_id", "180349")
 ).strip()
+# Minimum model probability for unlabelled offers (see train_relevance_model.py)
+RELEVANCE_THRESHOLD = float(FILTER_CFG.get("relevance_threshold", 0.5))
+# Games per listing page (alle-spiele.html, theme and player-count pages)
+LIST_PAGE_SIZE = max(1, int(FILTER_CFG.get("list_page_size", 48)))
 
 # Fenstergröße für Preisindikator (Tage)
 AVG_WINDOW_DAYS = 7
+# Rolling windows precomputed by the history store (days)
+AGG_WINDOWS = tuple(sorted({AVG_WINDOW_DAYS, 30, 60, 365}))
+# Price analytics: history considered, discount vs. Ø60 for a "Top-Deal"
+DEAL_HISTORY_DAYS = 365
+TOP_DEAL_DISCOUNT = 0.10
+DEALS_PAGE_SIZE = 30
+# URLs per sitemap file (limit of the sitemap protocol)
+SITEMAP_MAX_URLS = 50000
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+# Player-count landing pages exist for 1..MAX_PLAYER_PAGE players
+MAX_PLAYER_PAGE = 8
 
 env = Environment(
     loader=FileSystemLoader(str(TEMPLATES)),
@@ -60,23 +92,82 @@ def simple_md(text):
 
 env.filters["md"] = simple_md
 
+# Public assets also copied minified as name.<hash>.ext so they can be cached forever
+FINGERPRINTED_ASSETS = ("styles.css", "main.js", "game.js")
+# Asset name -> fingerprinted file name, set by main() and in render workers
+ASSETS = {}
+
+def asset_url(name):
+    """URL of a public asset, fingerprinted if ``copy_public`` made one."""
+    return "/" + ASSETS.get(name, name)
+
+env.globals["asset"] = asset_url
+
+try:  # libyaml is several times faster than the pure Python parser
+    YamlLoader = yaml.CSafeLoader
+except AttributeError:
+    YamlLoader = yaml.SafeLoader
+
 def load_yaml(path):
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
 def slugify(text):
     text = re.sub(r"[^\w\s-]", "", str(text).lower())
     return re.sub(r"\s+", "-", text).strip("-")
 
-# Map each game slug to its hub (title and slug)
-HUB_MAP = {}
-if HUBS_CFG.exists():
-    data = load_yaml(HUBS_CFG).get("hubs", [])
-    for h in data:
+def load_catalogue(cache_path=CATALOGUE_CACHE):
+    """Parse all game YAML files and hubs.yaml once for the whole build.
+
+    Returns ``(games, hubs)`` where ``games`` maps each YAML path (sorted) to
+    its data.  With ``cache_path`` parsed files are kept in a pickle and only
+    re-parsed when their mtime or size changed.
+    """
+    cached = {}
+    if cache_path and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("loader") == YamlLoader.__name__:
+                cached = data.get("entries") or {}
+        except Exception:
+            cached = {}
+
+    entries = {}
+    def parse(path):
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+        hit = cached.get(str(path))
+        if hit and hit[0] == stamp:
+            value = hit[1]
+        else:
+            value = load_yaml(path)
+        entries[str(path)] = (stamp, value)
+        return value
+
+    games = {p: parse(p) for p in sorted(CONTENT.glob("*.yaml"))}
+    hubs = (parse(HUBS_CFG) or {}).get("hubs", []) if HUBS_CFG.exists() else []
+
+    if cache_path and entries != cached:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"loader": YamlLoader.__name__, "entries": entries}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    return games, hubs
+
+def hub_map(hubs):
+    """Map each game slug to its hub (title and slug)."""
+    result = {}
+    for h in hubs:
         title = h.get("title", "")
         hslug = slugify(title)
         for s in h.get("slugs", []):
-            HUB_MAP[s] = {"title": title, "slug": hslug}
+            result[s] = {"title": title, "slug": hslug}
+    return result
+
+# Set from the catalogue by main() and in each render worker
+HUB_MAP = {}
 
 def load_offers(slug):
     """Return (offers, fetched_at) for ``slug``."""
@@ -105,6 +196,58 @@ def load_labels(slug):
     except Exception:
         return {}
 
+def offer_text(offer):
+    """Text the relevance model sees; must match train_relevance_model.py."""
+    return " ".join(
+        str(offer.get(k, ""))
+        for k in ["title", "subtitle", "condition", "shop", "description"]
+    )
+
+@functools.lru_cache(maxsize=1)
+def load_relevance_model(path=MODEL_PATH):
+    """Return the trained ``{"vectorizer", "model"}`` or None if unavailable."""
+    if not path.exists():
+        return None
+    try:
+        import joblib
+        return joblib.load(path)
+    except Exception:
+        logging.exception("Could not load relevance model %s", path)
+        return None
+
+def select_relevant(loaded, model=None, threshold=RELEVANCE_THRESHOLD):
+    """Filter the offers of all games at once.
+
+    ``loaded`` maps a key to ``(offers, labels)``.  Manually labelled offers
+    follow their label; all other offers of the catalogue are scored by
+    ``model`` in one batched transform and kept if their probability of
+    being relevant is at least ``threshold``.  Returns ``{key: offers}``
+    in the original order.
+    """
+    decisions = {}
+    pending = []
+    for key, (offers, labels) in loaded.items():
+        for i, o in enumerate(offers):
+            item_id = str(o.get("itemId") or o.get("id") or o.get("url") or "")
+            if item_id in labels or model is None or not item_id:
+                decisions[key, i] = is_relevant(o, labels)
+            else:
+                pending.append((key, i, o))
+    if pending:
+        clf = model["model"]
+        X = model["vectorizer"].transform([offer_text(o) for _, _, o in pending])
+        classes = list(clf.classes_)
+        if 1 in classes:
+            proba = clf.predict_proba(X)[:, classes.index(1)]
+        else:
+            proba = np.zeros(len(pending))
+        for (key, i, _), p in zip(pending, proba):
+            decisions[key, i] = bool(p >= threshold)
+    return {
+        key: [o for i, o in enumerate(offers) if decisions[key, i]]
+        for key, (offers, _) in loaded.items()
+    }
+
 def is_relevant(offer, labels):
     item_id = str(offer.get("itemId") or offer.get("id") or offer.get("url") or "")
     if not item_id:
@@ -113,8 +256,28 @@ def is_relevant(offer, labels):
         return False
     return bool(labels[item_id])
 
+def _last_line(path):
+    """Return ``(offset, line)`` of the last line in ``path`` (bytes)."""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos, tail = end, b""
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            cut = tail.rfind(b"\n", 0, len(tail) - 1)
+            if cut >= 0:
+                return pos + cut + 1, tail[cut + 1:]
+        return 0, tail
+
 def append_history(slug, offers):
-    """Append today's minimal price to the history file."""
+    """Record today's minimal price in the history file.
+
+    The file is only appended to; if the last line already is today's entry
+    it is replaced in place, so a build touches a few bytes, not the history.
+    Returns the entry, or None if there was no price.
+    """
     prices = []
     for o in offers:
         p = o.get("total_eur") or o.get("price_eur")
@@ -126,19 +289,46 @@ def append_history(slug, offers):
     HIST_DIR.mkdir(parents=True, exist_ok=True)
     path = HIST_DIR / f"{slug}.jsonl"
     entry = {"date": dt.date.today().isoformat(), "min": min_price}
-    lines = []
-    if path.exists():
-        for line in path.read_text(encoding="utf-8").splitlines():
-            try:
-                x = json.loads(line)
-                if x.get("date") != entry["date"]:
-                    lines.append(x)
-            except Exception:
-                pass
-    lines.append(entry)
-    with open(path, "w", encoding="utf-8") as f:
-        for x in lines:
-            f.write(json.dumps(x) + "\n")
+    line = (json.dumps(entry) + "\n").encode("utf-8")
+    if not path.exists() or path.stat().st_size == 0:
+        with open(path, "ab") as f:
+            f.write(line)
+        return entry
+    offset, last = _last_line(path)
+    if last == line:
+        return entry
+    try:
+        same_day = json.loads(last).get("date") == entry["date"]
+    except Exception:
+        same_day = False
+    with open(path, "r+b") as f:
+        if same_day:
+            # write before truncating: an interrupted build leaves a broken
+            # line that load_history skips, never a lost history
+            f.seek(offset)
+            f.write(line)
+            f.truncate()
+        else:
+            f.seek(0, os.SEEK_END)
+            f.write(line if last.endswith(b"\n") else b"\n" + line)
+    return entry
+
+def compact_history(path):
+    """Rewrite ``path`` with one entry per day (the day's minimum), sorted.
+
+    The new file is written next to the old one and swapped in atomically.
+    Returns True if the file changed.
+    """
+    rows = load_history(path.stem, path)
+    data = "".join(
+        json.dumps({"date": r["date"].isoformat(), "min": r["min"]}) + "\n" for r in rows
+    )
+    if path.read_text(encoding="utf-8") == data:
+        return False
+    tmp = path.with_suffix(".jsonl.tmp")
+    tmp.write_text(data, encoding="utf-8")
+    os.replace(tmp, path)
+    return True
 
 def build_amazon_search_url(game):
     queries = game.get("search_queries") or game.get("search_terms") or []
@@ -148,8 +338,8 @@ def build_amazon_search_url(game):
         q = game.get("title") or game.get("slug") or ""
     return f"https://www.amazon.de/s?k={quote_plus(q)}&tag={AMAZON_PARTNER_ID}"
 
-def load_history(slug):
-    path = HIST_DIR / f"{slug}.jsonl"
+def load_history(slug, path=None):
+    path = path or HIST_DIR / f"{slug}.jsonl"
     if not path.exists():
         return []
     day_values = {}
@@ -171,19 +361,176 @@ def load_history(slug):
     ]
     return rows
 
-def avg_window(rows, days):
-    """Return average over the last ``days`` days (inclusive)."""
-    cutoff = dt.date.today() - dt.timedelta(days=days - 1)
-    vals = []
-    for r in rows:
-        v = r.get("min")
-        if v is None:
-            v = r.get("avg")
-        if isinstance(v, (int, float)) and r["date"] >= cutoff:
-            vals.append(v)
-    if not vals:
-        return (None, 0)
-    return (round(sum(vals)/len(vals), 2), len(vals))
+def percentile(values, q):
+    """Linear-interpolated percentile ``q`` (0..100) of sorted ``values``."""
+    if not values:
+        return None
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+class HistoryStore:
+    """SQLite copy of ``data/history`` with rolling aggregates per game.
+
+    The JSONL files stay the source of truth.  A file is re-imported when its
+    size or content digest no longer matches; the digest is only computed
+    when the mtime moved (e.g. after a fresh checkout in CI).  Entries
+    written by this build are applied directly, and the min/avg/percentile
+    aggregates of each window in ``AGG_WINDOWS`` are recomputed only after a
+    re-import, a changed price or on a new day.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS days (
+        slug TEXT NOT NULL, date TEXT NOT NULL, min REAL NOT NULL,
+        PRIMARY KEY (slug, date)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sources (
+        slug TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT
+    );
+    CREATE TABLE IF NOT EXISTS aggregates (
+        slug TEXT NOT NULL, span INTEGER NOT NULL, as_of TEXT NOT NULL,
+        n INTEGER, min REAL, avg REAL, p25 REAL, p50 REAL,
+        PRIMARY KEY (slug, span)
+    );
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            self.db = sqlite3.connect(":memory:")
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(path)
+        self.db.executescript(self.SCHEMA)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def _stamp(self, slug):
+        path = HIST_DIR / f"{slug}.jsonl"
+        if not path.exists():
+            return None
+        st = path.stat()
+        return st.st_size, st.st_mtime_ns
+
+    def _save_stamp(self, slug, stamp, content=None):
+        content = content or digest(HIST_DIR / f"{slug}.jsonl")
+        self.db.execute(
+            "INSERT OR REPLACE INTO sources (slug, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+            (slug, *stamp, content),
+        )
+
+    def sync(self, slug):
+        """Re-import ``slug`` if its JSONL file changed outside this store."""
+        stamp = self._stamp(slug)
+        row = self.db.execute(
+            "SELECT size, mtime_ns, digest FROM sources WHERE slug = ?", (slug,)
+        ).fetchone()
+        if stamp is not None and row is not None and row[0] == stamp[0]:
+            if row[1] == stamp[1]:
+                return
+            content = digest(HIST_DIR / f"{slug}.jsonl")
+            if row[2] == content:  # touched only, e.g. by a fresh checkout
+                with self.db:
+                    self._save_stamp(slug, stamp, content)
+                return
+        with self.db:
+            self.db.execute("DELETE FROM days WHERE slug = ?", (slug,))
+            if stamp is None:
+                self.db.execute("DELETE FROM sources WHERE slug = ?", (slug,))
+                self.db.execute("DELETE FROM aggregates WHERE slug = ?", (slug,))
+                return
+            self.db.executemany(
+                "INSERT INTO days (slug, date, min) VALUES (?, ?, ?)",
+                [(slug, r["date"].isoformat(), r["min"]) for r in load_history(slug)],
+            )
+            self.db.execute("DELETE FROM aggregates WHERE slug = ?", (slug,))
+            self._save_stamp(slug, stamp)
+
+    def record(self, slug, entry):
+        """Apply an entry that ``append_history`` just wrote for ``slug``.
+
+        Cached aggregates survive unless the day's price actually changed.
+        """
+        previous = self.db.execute(
+            "SELECT min FROM days WHERE slug = ? AND date = ?", (slug, entry["date"])
+        ).fetchone()
+        with self.db:
+            if previous is None or previous[0] != entry["min"]:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO days (slug, date, min) VALUES (?, ?, ?)",
+                    (slug, entry["date"], entry["min"]),
+                )
+                self.db.execute("DELETE FROM aggregates WHERE slug = ?", (slug,))
+            self._save_stamp(slug, self._stamp(slug))
+
+    def rows(self, slug, since):
+        """Return ``[(date_iso, min)]`` of ``slug`` from ``since`` on."""
+        return self.db.execute(
+            "SELECT date, min FROM days WHERE slug = ? AND date >= ? ORDER BY date",
+            (slug, since.isoformat()),
+        ).fetchall()
+
+    def matrix(self, slugs, days, today=None):
+        """Return daily minimums as a ``len(slugs) x days`` array.
+
+        Missing days are NaN; the last column is ``today``.
+        """
+        today = today or dt.date.today()
+        start = today - dt.timedelta(days=days - 1)
+        out = np.full((len(slugs), days), np.nan)
+        index = {s: i for i, s in enumerate(slugs)}
+        rows = [
+            (index[slug], (dt.date.fromisoformat(date) - start).days, value)
+            for slug, date, value in self.db.execute(
+                "SELECT slug, date, min FROM days WHERE date BETWEEN ? AND ?",
+                (start.isoformat(), today.isoformat()),
+            )
+            if slug in index
+        ]
+        if rows:
+            i, j, v = zip(*rows)
+            out[list(i), list(j)] = v
+        return out
+
+    def aggregates(self, slug, today=None):
+        """Return ``{window: {n, min, avg, p25, p50}}`` for ``AGG_WINDOWS``.
+
+        A window of ``w`` days covers today and the ``w - 1`` days before.
+        """
+        today = today or dt.date.today()
+        as_of = today.isoformat()
+        rows = self.db.execute(
+            "SELECT span, n, min, avg, p25, p50 FROM aggregates WHERE slug = ? AND as_of = ?",
+            (slug, as_of),
+        ).fetchall()
+        if len(rows) != len(AGG_WINDOWS):
+            oldest = today - dt.timedelta(days=max(AGG_WINDOWS) - 1)
+            history = self.rows(slug, oldest)
+            rows = []
+            for w in AGG_WINDOWS:
+                cutoff = (today - dt.timedelta(days=w - 1)).isoformat()
+                vals = sorted(v for d, v in history if d >= cutoff)
+                if vals:
+                    rows.append((
+                        w, len(vals), vals[0], round(sum(vals) / len(vals), 2),
+                        percentile(vals, 25), percentile(vals, 50),
+                    ))
+                else:
+                    rows.append((w, 0, None, None, None, None))
+            with self.db:
+                self.db.execute("DELETE FROM aggregates WHERE slug = ?", (slug,))
+                self.db.executemany(
+                    "INSERT INTO aggregates (slug, span, as_of, n, min, avg, p25, p50) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(slug, w, as_of, *rest) for w, *rest in rows],
+                )
+        return {
+            w: {"n": n, "min": mn, "avg": avg, "p25": p25, "p50": p50}
+            for w, n, mn, avg, p25, p50 in rows
+        }
 
 def build_epn_search_url(game):
     queries = game.get("search_queries") or game.get("search_terms") or []
@@ -214,26 +561,146 @@ def parse_players(p):
         return n, n
     return (None, None)
 
-def render_game(yaml_path, site_url):
-    game = load_yaml(yaml_path)
+def analyse_prices(history, current):
+    """Price analytics for the whole catalogue in one vectorised pass.
 
-    required_fields = ["players", "playtime", "playtime_minutes", "complexity", "weight", "year"]
-    missing_fields = [f for f in required_fields if not game.get(f)]
-    if missing_fields:
-        logging.warning(
-            "Missing YAML fields for %s: %s",
-            game.get("slug"),
-            ", ".join(missing_fields),
+    ``history`` is a games x days array of daily minimums (NaN = no data,
+    last column = today) and ``current`` the current minimal prices (None if
+    there are no offers).  Returns one dict per game with
+
+    - ``trend``: good/ok/high for the current price vs. Ø7 (as on the pages)
+    - ``percentile``: share of earlier days (%) that were at most as cheap
+    - ``volatility``: std/mean of the daily minimums over 30 days
+    - ``discount60``: saving vs. Ø60 in percent
+    - ``deal_score``: discount weighted by how rare the price is
+    - ``top_deal``: at least ``TOP_DEAL_DISCOUNT`` below Ø60 or a new low
+    """
+    cur = np.array([np.nan if c is None else c for c in current], dtype=float)
+    valid = ~np.isnan(history)
+    filled = np.where(valid, history, 0.0)
+
+    def mean(days):
+        n = valid[:, -days:].sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.round(filled[:, -days:].sum(axis=1) / n, 2)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg7 = mean(AVG_WINDOW_DAYS)
+        avg30 = mean(30)
+        avg60 = mean(60)
+
+        ratio = cur / avg7
+        trend = np.select(
+            [ratio <= 0.95, ratio <= 1.05, ratio > 1.05], ["good", "ok", "high"], ""
         )
 
-    offers_raw, fetched_at = load_offers(game["slug"])
-    labels = load_labels(game["slug"])
-    offers_filtered = [o for o in offers_raw if is_relevant(o, labels)]
+        past, past_valid = history[:, :-1], valid[:, :-1]
+        n_past = past_valid.sum(axis=1)
+        cheaper = (past_valid & (past <= cur[:, None])).sum(axis=1)
+        percentile = np.where(n_past > 0, 100.0 * cheaper / n_past, np.nan)
+        past_low = np.where(past_valid, past, np.inf).min(axis=1)
+        new_low = (n_past >= AVG_WINDOW_DAYS) & (cur < past_low)
+
+        n30 = valid[:, -30:].sum(axis=1)
+        centered = np.where(valid[:, -30:], history[:, -30:] - avg30[:, None], 0.0)
+        std30 = np.sqrt((centered ** 2).sum(axis=1) / n30)
+        volatility = np.where(n30 >= 2, std30 / avg30, np.nan)
+
+        discount = 1 - cur / avg60
+        rarity = np.where(np.isnan(percentile), 0.5, 1 - percentile / 100)
+        deal_score = 100 * discount * rarity
+        top_deal = (discount >= TOP_DEAL_DISCOUNT) | new_low
+
+    def num(x, digits):
+        return None if np.isnan(x) else round(float(x), digits)
+
+    return [
+        {
+            "trend": str(trend[i]) or None,
+            "percentile": num(percentile[i], 1),
+            "volatility": num(volatility[i], 3),
+            "discount60": num(100 * discount[i], 1),
+            "deal_score": num(deal_score[i], 2),
+            "top_deal": bool(top_deal[i]) and not np.isnan(cur[i]),
+        }
+        for i in range(len(cur))
+    ]
+
+def prepare_catalogue(games, store, today=None, model=None):
+    """Prepare all ``games`` and run the catalogue-wide price analytics.
+
+    Unlabelled offers are kept or dropped by ``model`` (see
+    ``select_relevant``).  Returns ``{yaml path: data}``; a game that failed
+    maps to its traceback.
+    """
+    prepared = {}
+    loaded = {}
+    for p in sorted(games):
+        try:
+            slug = games[p]["slug"]
+            offers_raw, fetched_at = load_offers(slug)
+            loaded[p] = (offers_raw, load_labels(slug))
+            prepared[p] = fetched_at
+        except Exception:
+            prepared[p] = traceback.format_exc()
+    relevant = select_relevant(loaded, model)
+    for p in loaded:
+        try:
+            prepared[p] = prepare_game(games[p], store, relevant[p], prepared[p])
+        except Exception:
+            prepared[p] = traceback.format_exc()
+    ok = [p for p, d in prepared.items() if not isinstance(d, str)]
+    history = store.matrix([games[p]["slug"] for p in ok], DEAL_HISTORY_DAYS, today)
+    metrics = analyse_prices(history, [prepared[p]["min_price"] for p in ok])
+    for p, m in zip(ok, metrics):
+        prepared[p]["analytics"] = m
+    return prepared
+
+def prepare_game(game, store, offers_filtered, fetched_at):
+    """Collect the relevant offers and price history of ``game``.
+
+    Runs in the main process since it appends to the price history.
+    """
+    slug = game["slug"]
     offers = sorted(
         offers_filtered,
         key=lambda o: o.get("total_eur") or o.get("price_eur") or 1e9,
     )
-    append_history(game["slug"], offers)
+    store.sync(slug)
+    entry = append_history(slug, offers)
+    if entry:
+        store.record(slug, entry)
+    today = dt.date.today()
+    min_price = None
+    if offers:
+        first = offers[0]
+        min_price = first.get("total_eur") or first.get("price_eur")
+    return {
+        "offers": offers,
+        "min_price": min_price,
+        "fetched_at": fetched_at,
+        "history": store.rows(slug, today - dt.timedelta(days=30)),
+        "stats": store.aggregates(slug, today),
+    }
+
+def render_game(game, site_url, data):
+    """Render ``dist/spiel/<slug>/index.html``; return warnings for the log.
+
+    ``data`` comes from ``prepare_game``.
+    """
+    warnings = []
+    game = dict(game)
+
+    required_fields = ["players", "playtime", "playtime_minutes", "complexity", "weight", "year"]
+    missing_fields = [f for f in required_fields if not game.get(f)]
+    if missing_fields:
+        warnings.append(
+            "Missing YAML fields for %s: %s" % (game.get("slug"), ", ".join(missing_fields))
+        )
+
+    offers = data["offers"]
+    fetched_at = data["fetched_at"]
+    stats = data["stats"]
 
     fetched_at_display = None
     if fetched_at:
@@ -244,10 +711,7 @@ def render_game(yaml_path, site_url):
             fetched_at_display = fetched_at
 
     # minimaler Preis für Anzeige
-    min_price = None
-    if offers:
-        first = offers[0]
-        min_price = first.get("total_eur") or first.get("price_eur")
+    min_price = data["min_price"]
 
     # parse player count for template chip
     min_p, max_p = parse_players(game.get("players"))
@@ -256,17 +720,11 @@ def render_game(yaml_path, site_url):
     else:
         game["players"] = None
 
-    # Preisverlauf laden und Fenster berechnen
-    hist = load_history(game["slug"])
-    avg7, _ = avg_window(hist, AVG_WINDOW_DAYS)
-    avg30, _ = avg_window(hist, 30)
-
-    cutoff = dt.date.today() - dt.timedelta(days=30)
-    hist30 = [
-        {"date": r["date"].isoformat(), "min": r["min"]}
-        for r in hist
-        if isinstance(r.get("min"), (int, float)) and r["min"] > 0 and r["date"] >= cutoff
-    ]
+    # Preisverlauf und Fenster aus dem History-Store
+    avg7 = stats[AVG_WINDOW_DAYS]["avg"]
+    avg30 = stats[30]["avg"]
+    avg60 = stats[60]["avg"]
+    hist30 = [{"date": d, "min": v} for d, v in data["history"] if v > 0]
     hist_days = len(hist30)
 
     if min_price is not None:
@@ -277,18 +735,12 @@ def render_game(yaml_path, site_url):
             hist30.append({"date": today, "min": round(min_price, 2)})
         hist_days = len(hist30)
 
-    price_trend = None
-    if min_price is not None and avg7:
-        try:
-            ratio = min_price / avg7
-            if ratio <= 0.95:
-                price_trend = "good"
-            elif ratio <= 1.05:
-                price_trend = "ok"
-            else:
-                price_trend = "high"
-        except Exception:
-            price_trend = None
+    delta60 = None
+    if min_price is not None and avg60:
+        delta60 = round((min_price - avg60) / avg60 * 100, 1)
+
+    analytics = data["analytics"]
+    price_trend = analytics["trend"]
 
     # Affiliate-Suchen
     ebay_search_url = build_epn_search_url(game)
@@ -316,6 +768,10 @@ def render_game(yaml_path, site_url):
         offers=offers[:3],
         avg30=avg30,
         avg7=avg7,
+        avg60=avg60,
+        delta60=delta60,
+        price_stats=stats,
+        deal=analytics,
         avg_days=AVG_WINDOW_DAYS,
         hist_days=hist_days,
         min_price=min_price,
@@ -335,24 +791,392 @@ def render_game(yaml_path, site_url):
         meta_description=f"Preisradar, aktuelle Angebote und Deals für {game['title']}.",
         content=page_html,
         disclosure=game.get("disclosure",""),
-        site_url=site_url
+        site_url=site_url,
     )
 
-    out_dir = DIST / "spiel" / game["slug"]
-    out_dir.mkdir(parents=True, exist_ok=True)
-    (out_dir / "index.html").write_text(out_html, encoding="utf-8")
+    write_page(DIST / "spiel" / game["slug"] / "index.html", out_html)
+    return warnings
+
+def _init_worker(hubs, assets):
+    """Set up a worker process: hub map, assets and compiled page templates."""
+    global HUB_MAP, ASSETS
+    HUB_MAP = hubs
+    ASSETS = assets
+    env.get_template("page.html.jinja")
+    env.get_template("layout.html.jinja")
 
-def copy_public():
+def _render_task(yaml_path, game, site_url, data):
+    if isinstance(data, str):  # preparing already failed
+        return yaml_path, [], data
+    try:
+        return yaml_path, render_game(game, site_url, data), None
+    except Exception:
+        return yaml_path, [], traceback.format_exc()
+
+def render_games(games, site_url, jobs=1, prepared=None):
+    """Render the pages of ``games`` ({yaml path: data}) using ``jobs`` processes.
+
+    ``prepared`` comes from ``prepare_catalogue`` and is computed here if
+    omitted.  Warnings and errors are logged in file order regardless of
+    which worker finished first.  Returns the paths of pages that failed.
+    """
+    paths = sorted(games)
+    if prepared is None:
+        store = HistoryStore(HISTORY_DB)
+        try:
+            prepared = prepare_catalogue(games, store)
+        finally:
+            store.close()
+    args = (paths, [games[p] for p in paths], [site_url] * len(paths), [prepared[p] for p in paths])
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(HUB_MAP, ASSETS)
+        ) as pool:
+            results = list(pool.map(
+                _render_task, *args, chunksize=max(1, len(paths) // (jobs * 4)),
+            ))
+    else:
+        results = list(map(_render_task, *args))
+    failed = []
+    for path, warnings, error in results:
+        for w in warnings:
+            logging.warning(w)
+        if error:
+            failed.append(path)
+            logging.error("Rendering %s failed:\n%s", path.name, error)
+            print(f"❌ {path.name}: {error.strip().splitlines()[-1]}")
+    return failed
+
+def digest(*parts):
+    """Hash files (by content) and plain values into one hex digest."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, pathlib.Path):
+            data = part.read_bytes() if part.is_file() else b"\0missing"
+        else:
+            data = str(part).encode("utf-8")
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+def build_fingerprint(site_url):
+    """Digest of the inputs shared by all pages: code, templates, config, env.
+
+    Today's date is part of it because price windows move every day.
+    """
+    templates = sorted(p for p in TEMPLATES.rglob("*") if p.is_file())
+    return digest(
+        pathlib.Path(__file__), FILTER_PATH, HUBS_CFG,
+        *(p.relative_to(TEMPLATES).as_posix() for p in templates), *templates,
+        site_url, *(os.environ.get(k, "") for k in BUILD_ENV_VARS),
+        json.dumps(ASSETS, sort_keys=True), dt.date.today().isoformat(),
+    )
+
+def game_output(game):
+    """Output path of ``game``'s page, as written by ``render_game``."""
+    return f"spiel/{game['slug']}/index.html"
+
+def page_key(yaml_path, game, fingerprint, data):
+    if isinstance(data, str):  # preparing failed, always retry
+        return None
+    slug = game["slug"]
+    return digest(
+        fingerprint, yaml_path,
+        DATA / f"{slug}.json", LABEL_DIR / f"{slug}.json", HIST_DIR / f"{slug}.jsonl",
+        json.dumps(data.get("analytics"), sort_keys=True),
+        # the selection depends on the relevance model, not just the files
+        json.dumps(data["offers"], sort_keys=True, default=str),
+    )
+
+class BuildManifest:
+    """Input digests per output file of the previous build.
+
+    Entries recorded with key ``None`` keep their output (e.g. a page whose
+    rendering failed) but are rebuilt next time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.root = path.parent
+        self.previous = {}
+        self.outputs = {}
+        try:
+            data = json.loads(path.read_text("utf-8"))
+            self.previous = dict(data.get("outputs") or {})
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+    def fresh(self, output, key):
+        """Return True (and keep the entry) if ``output`` was built from ``key``."""
+        if key is not None and self.previous.get(output) == key and (self.root / output).is_file():
+            self.outputs[output] = key
+            return True
+        return False
+
+    def record(self, output, key):
+        self.outputs[output] = key
+
+    def prune(self):
+        """Delete outputs of the previous build that were not produced again."""
+        removed = []
+        for output in sorted(set(self.previous) - set(self.outputs)):
+            target = self.root / output
+            if target.is_file():
+                target.unlink()
+                removed.append(output)
+            parent = target.parent
+            while parent != self.root and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return removed
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"version": 1, "outputs": dict(sorted(self.outputs.items()))}, indent=0),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+def rebuild(manifest, output, key, build, *args):
+    """Run ``build(*args)`` unless ``output`` is fresh; return True if built."""
+    if manifest.fresh(output, key):
+        return False
+    build(*args)
+    manifest.record(output, key)
+    return True
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fingerprint_name(rel, hexdigest):
+    """``styles.css`` -> ``styles.<first 10 hex digits>.css``."""
+    stem, _, ext = rel.rpartition(".")
+    return f"{stem}.{hexdigest[:10]}.{ext}"
+
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write clones (btrfs, XFS)
+
+def _reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dst)
+
+def copy_file(src, dst, link=False, src_digest=None):
+    """Copy ``src`` to ``dst`` byte for byte unless ``dst`` is identical.
+
+    With ``link`` a hard link is tried first (only safe if nothing edits
+    ``dst`` in place), then a reflink, then a plain copy.  Returns True if
+    ``dst`` was written.
+    """
+    src_digest = src_digest or file_digest(src)
+    if (
+        dst.is_file()
+        and dst.stat().st_size == src.stat().st_size
+        and file_digest(dst) == src_digest
+    ):
+        return False
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    for method in ((os.link,) if link else ()) + (_reflink,):
+        try:
+            method(src, tmp)
+            break
+        except (OSError, ImportError):
+            tmp.unlink(missing_ok=True)
+    else:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return True
+
+def write_file(dst, data):
+    """Write bytes to ``dst`` via a temporary file unless it already holds them."""
+    if dst.is_file() and dst.stat().st_size == len(data) and dst.read_bytes() == data:
+        return False
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dst)
+    return True
+
+# Comments, quoted strings and everything in between
+_CSS_TOKENS = re.compile(r"""/\*.*?\*/|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[^"'/]+|/""", re.S)
+
+def minify_css(css):
+    """Drop comments and redundant whitespace; strings are left untouched."""
+    parts = []  # alternating code / string segments
+    for tok in _CSS_TOKENS.findall(css):
+        if tok.startswith("/*"):
+            tok = " "
+        if tok[0] in "\"'" or not parts or parts[-1][0] in "\"'":
+            parts.append(tok)
+        else:
+            parts[-1] += tok
+    out = []
+    for part in parts:
+        if part[0] not in "\"'":
+            part = re.sub(r"\s+", " ", part)
+            part = re.sub(r" ?([{};,>]) ?", r"\1", part)
+            part = part.replace(": ", ":").replace(";}", "}")
+        out.append(part)
+    return "".join(out).strip()
+
+def minify_js(js):
+    """Strip indentation, blank lines and whole-line ``//`` comments.
+
+    Line breaks are kept so automatic semicolon insertion still works, and
+    lines inside multi-line template literals are copied verbatim.
+    """
+    out = []
+    in_template = False
+    for line in js.splitlines():
+        if not in_template:
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+        out.append(line)
+        if line.count("`") % 2:
+            in_template = not in_template
+    return "\n".join(out)
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+_RAW_HTML = re.compile(r"(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)", re.S | re.I)
+
+def minify_html(html):
+    """Collapse indentation between lines and minify inline scripts and styles.
+
+    Whitespace is never removed entirely (a newline remains), so inline
+    elements keep their spacing; ``pre`` and ``textarea`` stay as they are.
+    """
+    out = []
+    pos = 0
+    for m in _RAW_HTML.finditer(html):
+        out.append(re.sub(r"\s*\n\s*", "\n", html[pos:m.start()]))
+        tag, body = m.group(2).lower(), m.group(3)
+        if tag == "script":
+            body = minify_js(body)
+        elif tag == "style":
+            body = minify_css(body)
+        out.append(m.group(1) + body + m.group(4))
+        pos = m.end()
+    out.append(re.sub(r"\s*\n\s*", "\n", html[pos:]))
+    return "".join(out).strip() + "\n"
+
+def write_page(path, html):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(minify_html(html), encoding="utf-8")
+
+def copy_public(manifest=None, link=False):
+    """Copy ``public/`` into ``dist/``; return the fingerprinted asset names.
+
+    Fingerprinted assets are minified, so their hash covers the minified text.
+    """
+    assets = {}
     if not PUBLIC.exists():
-        return
-    for p in PUBLIC.rglob("*"):
-        if p.is_file():
-            target = DIST / p.relative_to(PUBLIC)
-            target.parent.mkdir(parents=True, exist_ok=True)
-            target.write_text(p.read_text(encoding="utf-8"), encoding="utf-8")
-
-def build_game_list(site_url):
-    raw_games = [load_yaml(p) for p in CONTENT.glob("*.yaml")]
+        return assets
+    for p in sorted(PUBLIC.rglob("*")):
+        if not p.is_file():
+            continue
+        rel = p.relative_to(PUBLIC).as_posix()
+        key = file_digest(p)
+        if manifest is None or not manifest.fresh(rel, key):
+            copy_file(p, DIST / rel, link, key)
+            if manifest is not None:
+                manifest.record(rel, key)
+        if rel in FINGERPRINTED_ASSETS:
+            data = MINIFIERS[p.suffix](p.read_text("utf-8")).encode("utf-8")
+            key = hashlib.sha256(data).hexdigest()
+            name = assets[rel] = fingerprint_name(rel, key)
+            if manifest is None or not manifest.fresh(name, key):
+                write_file(DIST / name, data)
+                if manifest is not None:
+                    manifest.record(name, key)
+    return assets
+
+# ä -> ae (as typed on German keyboards) and ä -> a (as typed without umlauts)
+_FOLD_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_FOLD_PLAIN = str.maketrans({"ß": "ss"})
+
+def fold(text, umlauts=True):
+    """Lower-case ``text`` and strip accents, spelling umlauts out if ``umlauts``."""
+    text = str(text).lower().translate(_FOLD_UMLAUTS if umlauts else _FOLD_PLAIN)
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def search_tokens(text):
+    """Tokens of ``text`` under both umlaut foldings (``käse`` -> kaese, kase)."""
+    return sorted({t for u in (True, False) for t in re.findall(r"[a-z0-9]+", fold(text, u))})
+
+def bitset(ids, n):
+    """Encode game indices as a list of 32-bit words."""
+    words = [0] * ((n + 31) // 32)
+    for i in ids:
+        words[i >> 5] |= 1 << (i & 31)
+    return words
+
+def build_search_index(games):
+    """Search index for the client-side filter on ``alle-spiele.html``.
+
+    ``games`` are the sorted list entries from ``plan_listings``; indices
+    refer to that order.  Tokens map to game indices, filters are bitsets:
+    ``players[n]`` (n players possible), ``ages`` (cumulative: recommended
+    age at most a) and ``themes[t]``.
+    """
+    n = len(games)
+    tokens, players, ages, themes = {}, {}, {}, {}
+    for i, g in enumerate(games):
+        for t in search_tokens(g["title_short"]):
+            tokens.setdefault(t, []).append(i)
+        if g["min_players"] is not None and g["max_players"] is not None:
+            for count in range(g["min_players"], g["max_players"] + 1):
+                players.setdefault(count, []).append(i)
+        if g["age"] is not None:
+            ages.setdefault(g["age"], []).append(i)
+        for t in g["themes"]:
+            themes.setdefault(t, []).append(i)
+    cumulative, age_sets = [], []
+    for age in sorted(ages):
+        cumulative += ages[age]
+        age_sets.append([age, bitset(cumulative, n)])
+    return {
+        "games": [[g["title_short"], g["slug"]] for g in games],
+        "tokens": tokens,
+        "players": {str(c): bitset(ids, n) for c, ids in sorted(players.items())},
+        "ages": age_sets,
+        "themes": {t: bitset(ids, n) for t, ids in sorted(themes.items())},
+    }
+
+def write_search_index(games):
+    """Write ``search-index.<hash>.json`` (removing older ones); return its name."""
+    data = json.dumps(
+        build_search_index(games), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    name = fingerprint_name("search-index.json", hashlib.sha256(data).hexdigest())
+    write_file(DIST / name, data)
+    for old in DIST.glob("search-index.*.json"):
+        if old.name != name:
+            old.unlink()
+    return name
+
+def listing_url(base, page):
+    """``/alle-spiele`` -> ``/alle-spiele.html``, ``/alle-spiele/seite-2.html``, …"""
+    return f"{base}.html" if page == 1 else f"{base}/seite-{page}.html"
+
+def plan_listings(raw_games, page_size=LIST_PAGE_SIZE):
+    """Sort the catalogue and split it into listing pages in one pass.
+
+    Besides ``alle-spiele.html`` there is a landing page (series) per theme
+    and per player count up to ``MAX_PLAYER_PAGE``.  Returns ``games`` (all
+    list entries, sorted), ``themes`` and ``pages``, each page a dict with
+    ``url``, ``title``, ``games`` and ``page``/``pages``/``prev``/``next``.
+    """
     games = []
     theme_set = set()
 
@@ -363,6 +1187,7 @@ def build_game_list(site_url):
         return int(m.group(0)) if m else None
 
     for g in raw_games:
+        g = dict(g)
         title_short = g["title"].split(" –")[0]
         min_p, max_p = parse_players(g.get("players"))
         age = parse_age(g.get("age"))
@@ -380,20 +1205,85 @@ def build_game_list(site_url):
         games.append(g)
 
     games = sorted(games, key=lambda g: g["title_short"].lower())
+    by_theme, by_players = {}, {}
+    for g in games:
+        for t in g["themes"]:
+            by_theme.setdefault(t, []).append(g)
+        if g["min_players"] is not None and g["max_players"] is not None:
+            for n in range(g["min_players"], min(g["max_players"], MAX_PLAYER_PAGE) + 1):
+                by_players.setdefault(n, []).append(g)
+
+    # (kind, base url, link label, heading, page title, games)
+    series = [("alle", "/alle-spiele", "Alle Spiele", "Alle Spiele", "Alle Brettspiel-Angebote", games)]
+    for n in sorted(by_players):
+        label = f"{n} {'Person' if n == 1 else 'Personen'}"
+        heading = f"Brettspiele für {label}"
+        series.append(("spieler", f"/spieler/{n}", label, heading, heading, by_players[n]))
+    for t in sorted(by_theme):
+        heading = f"Brettspiele zum Thema {t}"
+        series.append(("thema", f"/thema/{slugify(t)}", t, heading, heading, by_theme[t]))
+    pages = []
+    for kind, base, label, heading, title, members in series:
+        count = max(1, -(-len(members) // page_size))
+        for page in range(1, count + 1):
+            pages.append({
+                "kind": kind,
+                "url": listing_url(base, page),
+                "title": title if page == 1 else f"{title} – Seite {page}",
+                "label": label,
+                "heading": heading,
+                "games": members[(page - 1) * page_size:page * page_size],
+                "total": len(members),
+                "page": page,
+                "pages": count,
+                "prev": listing_url(base, page - 1) if page > 1 else None,
+                "next": listing_url(base, page + 1) if page < count else None,
+                "numbers": [(n, listing_url(base, n)) for n in range(1, count + 1)],
+            })
+    return {"games": games, "themes": sorted(theme_set), "pages": pages}
+
+LISTING_DIRS = ("alle-spiele", "spieler", "thema")
+
+def build_game_list(listing, site_url):
+    """Render all pages planned by ``plan_listings`` plus the search index."""
+    DIST.mkdir(exist_ok=True)
+    index_url = "/" + write_search_index(listing["games"])
+    browse = {
+        kind: [(p["label"], p["url"]) for p in listing["pages"] if p["kind"] == kind and p["page"] == 1]
+        for kind in ("spieler", "thema")
+    }
     tpl = env.get_template("games.html.jinja")
-    inner = tpl.render(games=games, themes=sorted(theme_set))
     layout_tpl = env.get_template("layout.html.jinja")
-    out_html = layout_tpl.render(
-        title="Alle Brettspiel-Angebote",
-        product_name="Brettspiele",
-        meta_description="Aktuelle Angebote & Preisvergleich für Brettspiele.",
-        content=inner,
-        disclosure="",
-        site_url=site_url,
-        canonical=f"{site_url}/alle-spiele.html",
-    )
-    DIST.mkdir(exist_ok=True)
-    (DIST / "alle-spiele.html").write_text(out_html, encoding="utf-8")
+    written = set()
+    for page in listing["pages"]:
+        inner = tpl.render(
+            listing=page,
+            games=page["games"],
+            themes=listing["themes"],
+            index_url=index_url if page["kind"] == "alle" else None,
+            browse=browse,
+        )
+        out_html = layout_tpl.render(
+            title=page["title"],
+            product_name="Brettspiele",
+            meta_description=(
+                "Aktuelle Angebote & Preisvergleich für Brettspiele." if page["kind"] == "alle"
+                else f"{page['heading']}: aktuelle Angebote & Preisvergleich ({page['total']} Spiele)."
+            ),
+            content=inner,
+            disclosure="",
+            site_url=site_url,
+            canonical=site_url + page["url"],
+            prev_url=page["prev"] and site_url + page["prev"],
+            next_url=page["next"] and site_url + page["next"],
+        )
+        write_page(DIST / page["url"].lstrip("/"), out_html)
+        written.add(page["url"].lstrip("/"))
+    # pages of themes or page counts that no longer exist
+    for d in LISTING_DIRS:
+        for p in (DIST / d).rglob("*.html") if (DIST / d).is_dir() else ():
+            if p.relative_to(DIST).as_posix() not in written:
+                p.unlink()
 
 def build_home(site_url):
     tpl = env.get_template("landing.html.jinja")
@@ -409,13 +1299,11 @@ def build_home(site_url):
         canonical=f"{site_url}/",
     )
     DIST.mkdir(exist_ok=True)
-    (DIST / "index.html").write_text(out_html, encoding="utf-8")
+    write_page(DIST / "index.html", out_html)
 
-def build_hubs(site_url):
-    cfg = ROOT / "content" / "hubs.yaml"
-    if not cfg.exists():
+def build_hubs(hubs, site_url):
+    if not HUBS_CFG.exists():
         return
-    hubs = load_yaml(cfg).get("hubs", [])
     # simple hubs page
     html = ["<h1>Themen-Hubs</h1><div class='grid two'>"]
     for h in hubs:
@@ -438,20 +1326,205 @@ def build_hubs(site_url):
         disclosure="",
         site_url=site_url
     )
-    (DIST / "hubs.html").write_text(out_html, encoding="utf-8")
-
-def build_sitemap(site_url):
-    slugs = [p.stem for p in CONTENT.glob("*.yaml")]
-    urlset = ET.Element("urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
-    def add(loc):
-        u = ET.SubElement(urlset, "url")
-        ET.SubElement(u, "loc").text = loc
-    add(site_url + "/")
-    add(site_url + "/alle-spiele.html")
-    add(site_url + "/hubs.html")
-    for s in slugs:
-        add(f"{site_url}/spiel/{s}/")
-    ET.ElementTree(urlset).write(DIST/"sitemap.xml", encoding="utf-8", xml_declaration=True)
+    write_page(DIST / "hubs.html", out_html)
+
+def _compress(path, key):
+    """Write ``path.gz`` (and ``path.br``); return ``(key, raw, gz, br)`` sizes."""
+    raw = path.read_bytes()
+    gz = gzip.compress(raw, compresslevel=9, mtime=0)
+    path.with_name(path.name + ".gz").write_bytes(gz)
+    br = None
+    if brotli is not None:
+        br = brotli.compress(raw, quality=11)
+        path.with_name(path.name + ".br").write_bytes(br)
+    return key, len(raw), len(gz), len(br) if br is not None else None
+
+def precompress(root=None, jobs=1):
+    """Write .gz/.br siblings for the text files in ``root`` (default dist/).
+
+    Files whose content hash matches the last run (``.compress-manifest.json``)
+    and whose siblings exist are skipped; siblings of deleted files are
+    removed.  Returns totals for the report.
+    """
+    root = root or DIST
+    manifest_path = root / COMPRESS_MANIFEST_NAME
+    try:
+        previous = json.loads(manifest_path.read_text("utf-8"))
+    except (OSError, ValueError):
+        previous = {}
+    suffixes = (".gz", ".br") if brotli is not None else (".gz",)
+
+    hashes, todo = {}, []
+    for p in sorted(root.rglob("*")):
+        rel = p.relative_to(root).as_posix()
+        if p.suffix in (".gz", ".br"):
+            if not p.with_suffix("").is_file():
+                p.unlink()
+            continue
+        if not p.is_file() or p.suffix not in COMPRESS_SUFFIXES or p.name.startswith("."):
+            continue
+        key = file_digest(p)
+        hashes[rel] = key
+        siblings = [p.with_name(p.name + s) for s in suffixes]
+        if previous.get(rel) != key or not all(s.exists() for s in siblings):
+            todo.append((p, rel))
+
+    totals = {"files": len(hashes), "compressed": len(todo), "raw": 0, "gz": 0, "br": 0}
+    # zlib and brotli release the GIL, threads are enough
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for rel, raw, gz, br in pool.map(lambda t: _compress(*t), todo):
+            totals["raw"] += raw
+            totals["gz"] += gz
+            totals["br"] += br or 0
+    manifest_path.write_text(json.dumps(hashes, indent=0, sort_keys=True), encoding="utf-8")
+    return totals
+
+def print_compress_report(totals):
+    if brotli is None:
+        print("⚠ Paket brotli nicht installiert – keine .br-Dateien (pip install -r requirements.txt)")
+    if not totals["compressed"]:
+        print(f"✔ {totals['files']} Dateien bereits komprimiert")
+        return
+    raw = totals["raw"]
+    line = (
+        f"✔ {totals['compressed']} von {totals['files']} Dateien komprimiert: "
+        f"{raw / 1024:.0f} KB → gzip {totals['gz'] / 1024:.0f} KB "
+        f"(−{100 - 100 * totals['gz'] / raw:.0f} %)"
+    )
+    if brotli is not None:
+        line += f", brotli {totals['br'] / 1024:.0f} KB (−{100 - 100 * totals['br'] / raw:.0f} %)"
+    print(line)
+
+def select_deals(games, prepared, limit=DEALS_PAGE_SIZE):
+    """Return the current top deals of the catalogue, best score first."""
+    deals = []
+    for p, g in games.items():
+        data = prepared.get(p)
+        if isinstance(data, str) or not data or not data["analytics"]["top_deal"]:
+            continue
+        a = data["analytics"]
+        deals.append({
+            "slug": g["slug"],
+            "title_short": g["title"].split(" –")[0],
+            "min_price": data["min_price"],
+            "avg60": data["stats"][60]["avg"],
+            "discount60": a["discount60"],
+            "percentile": a["percentile"],
+            "deal_score": a["deal_score"],
+        })
+    deals.sort(key=lambda d: (-(d["deal_score"] or 0), d["title_short"].lower()))
+    return deals[:limit]
+
+def build_deals(deals, site_url):
+    tpl = env.get_template("deals.html.jinja")
+    inner = tpl.render(deals=deals)
+    layout_tpl = env.get_template("layout.html.jinja")
+    out_html = layout_tpl.render(
+        title="Top-Deals: Brettspiele gerade günstig",
+        product_name="Brettspiele",
+        meta_description="Brettspiele, die gerade deutlich unter ihrem 60-Tage-Durchschnitt zu haben sind.",
+        content=inner,
+        disclosure="",
+        site_url=site_url,
+        canonical=f"{site_url}/top-deals.html",
+    )
+    DIST.mkdir(exist_ok=True)
+    write_page(DIST / "top-deals.html", out_html)
+
+def page_lastmod(yaml_path, data):
+    """W3C timestamp (UTC) of the offers' ``fetched_at``, else of the YAML file."""
+    fetched_at = data.get("fetched_at") if isinstance(data, dict) else None
+    ts = None
+    if fetched_at:
+        try:
+            ts = dt.datetime.fromisoformat(str(fetched_at).replace("Z", "+00:00"))
+        except ValueError:
+            ts = None
+        if ts is not None and ts.tzinfo is None:
+            ts = ts.replace(tzinfo=dt.timezone.utc)
+    if ts is None:
+        try:
+            ts = dt.datetime.fromtimestamp(yaml_path.stat().st_mtime, dt.timezone.utc)
+        except OSError:
+            return None
+    return ts.astimezone(dt.timezone.utc).replace(microsecond=0).isoformat()
+
+def sitemap_entries(site_url, listing_urls, games, prepared):
+    """Yield ``(loc, lastmod)`` for every page, game pages sorted by slug."""
+    for url in ("/", "/alle-spiele.html", "/hubs.html", "/top-deals.html"):
+        yield site_url + url, None
+    for url in listing_urls:
+        if url != "/alle-spiele.html":
+            yield site_url + url, None
+    for p in sorted(games, key=lambda p: games[p]["slug"]):
+        yield f"{site_url}/spiel/{games[p]['slug']}/", page_lastmod(p, prepared.get(p))
+
+def write_streamed(name, chunks, manifest=None):
+    """Stream text ``chunks`` into ``dist/<name>``; keep the file if unchanged.
+
+    Returns True if the file was (re)written.
+    """
+    path = DIST / name
+    tmp = path.with_name(name + ".tmp")
+    h = hashlib.sha256()
+    with open(tmp, "wb") as f:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            h.update(data)
+            f.write(data)
+    key = h.hexdigest()
+    if manifest is not None:
+        manifest.record(name, key)
+    if path.is_file() and file_digest(path) == key:
+        tmp.unlink()
+        return False
+    os.replace(tmp, path)
+    return True
+
+def _urlset(entries, latest):
+    """Lines of one sitemap shard; ``latest[0]`` ends up as its newest lastmod."""
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+    for loc, lastmod in entries:
+        if lastmod:
+            latest[0] = max(latest[0] or lastmod, lastmod)
+            yield f"<url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod></url>\n"
+        else:
+            yield f"<url><loc>{escape(loc)}</loc></url>\n"
+    yield "</urlset>\n"
+
+def build_sitemap(entries, site_url, manifest=None, max_urls=SITEMAP_MAX_URLS):
+    """Write ``sitemap.xml`` as index of ``sitemap-<n>.xml`` shards.
+
+    ``entries`` are ``(loc, lastmod)`` pairs and are consumed as a stream,
+    at most ``max_urls`` per shard.  Shards and index are only rewritten if
+    their content changed, so their modification times stay meaningful.
+    Returns the names of the files written.
+    """
+    DIST.mkdir(parents=True, exist_ok=True)
+    entries = iter(entries)
+    shards, written = [], []
+    for first in entries:
+        batch = itertools.chain([first], itertools.islice(entries, max_urls - 1))
+        name = f"sitemap-{len(shards) + 1}.xml"
+        latest = [None]
+        if write_streamed(name, _urlset(batch, latest), manifest):
+            written.append(name)
+        shards.append((name, latest[0]))
+
+    def index():
+        yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+        for name, lastmod in shards:
+            mod = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+            yield f"<sitemap><loc>{escape(site_url)}/{name}</loc>{mod}</sitemap>\n"
+        yield "</sitemapindex>\n"
+
+    if write_streamed("sitemap.xml", index(), manifest):
+        written.append("sitemap.xml")
+    current = {name for name, _ in shards}
+    for old in DIST.glob("sitemap-*.xml"):
+        if old.name not in current:
+            old.unlink()
+    return written
 
 def clean_dist():
     if DIST.exists():
@@ -459,17 +1532,111 @@ def clean_dist():
             if p.is_file():
                 p.unlink()
 
-def main():
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Build the static site into dist/")
+    ap.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=int(os.environ.get("BUILD_JOBS", "1") or 1),
+        help="parallel processes for game pages (0 = all CPU cores)",
+    )
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild outputs whose inputs changed since the last build",
+    )
+    ap.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="parse all YAML files instead of using data/cache/catalogue.pickle",
+    )
+    ap.add_argument(
+        "--no-model",
+        action="store_true",
+        help="show only manually labelled offers, ignore data/relevance_model.pkl",
+    )
+    ap.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="hard-link public/ files into dist/ instead of copying them",
+    )
+    ap.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write .gz (and .br if brotli is installed) files next to the output",
+    )
+    ap.add_argument(
+        "--compress-only",
+        action="store_true",
+        help="only precompress dist/, e.g. after post-processing the HTML",
+    )
+    ap.add_argument(
+        "--compact-history",
+        action="store_true",
+        help="dedupe data/history to one entry per day and exit",
+    )
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    global HUB_MAP, ASSETS
+    args = parse_args(argv)
+    if args.compact_history:
+        changed = [p for p in sorted(HIST_DIR.glob("*.jsonl")) if compact_history(p)]
+        print(f"✔ {len(changed)} Verlaufsdateien kompaktiert")
+        return
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    if args.compress_only:
+        print_compress_report(precompress(DIST, jobs))
+        return
     site_url = os.environ.get("SITE_URL","http://localhost:8000")
-    clean_dist()
+    if not args.incremental:
+        clean_dist()
     DIST.mkdir(parents=True, exist_ok=True)
-    copy_public()
-    for yml in CONTENT.glob("*.yaml"):
-        render_game(yml, site_url)
-    build_game_list(site_url)
-    build_home(site_url)
-    build_hubs(site_url)
-    build_sitemap(site_url)
+    manifest = BuildManifest(DIST / MANIFEST_NAME)
+    ASSETS = copy_public(manifest, link=args.link_assets)
+    fingerprint = build_fingerprint(site_url)
+
+    games, hubs = load_catalogue(None if args.no_cache else CATALOGUE_CACHE)
+    HUB_MAP = hub_map(hubs)
+    yaml_paths = list(games)
+    store = HistoryStore(HISTORY_DB)
+    try:
+        model = None if args.no_model else load_relevance_model()
+        prepared = prepare_catalogue(games, store, model=model)
+    finally:
+        store.close()
+    keys = {p: page_key(p, games[p], fingerprint, prepared[p]) for p in yaml_paths}
+    todo = [p for p in yaml_paths if not manifest.fresh(game_output(games[p]), keys[p])]
+    failed = render_games({p: games[p] for p in todo}, site_url, jobs=jobs, prepared=prepared)
+    for p in todo:
+        manifest.record(game_output(games[p]), None if p in failed else keys[p])
+
+    listing = plan_listings(games.values())
+    rebuild(
+        manifest, "alle-spiele.html", digest(fingerprint, *yaml_paths),
+        build_game_list, listing, site_url,
+    )
+    rebuild(manifest, "index.html", fingerprint, build_home, site_url)
+    rebuild(manifest, "hubs.html", fingerprint, build_hubs, hubs, site_url)
+    deals = select_deals(games, prepared)
+    rebuild(
+        manifest, "top-deals.html", digest(fingerprint, json.dumps(deals, sort_keys=True)),
+        build_deals, deals, site_url,
+    )
+    listing_urls = [p["url"] for p in listing["pages"]]
+    build_sitemap(
+        sitemap_entries(site_url, listing_urls, games, prepared), site_url, manifest,
+    )
+    removed = manifest.prune()
+    manifest.save()
+    print(
+        f"✔ {len(todo)} von {len(yaml_paths)} Spielseiten gebaut"
+        + (f", {len(removed)} veraltete Dateien entfernt" if removed else "")
+    )
+    if args.precompress:
+        print_compress_report(precompress(DIST, jobs))
+    if failed:
+        raise SystemExit(f"{len(failed)} Spielseite(n) fehlgeschlagen, siehe data/logs/build.log")
 
 if __name__ == "__main__":
     main()
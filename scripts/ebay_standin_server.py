@@ -0,0 +1,172 @@
+"""Local stand-in for the eBay Browse API serving recorded responses.
+
+Record responses first with ``fetch_offers_ebay_enhanced.py --record``, then
+start this server and point the fetcher at it::
+
+    python scripts/ebay_standin_server.py --latency-ms 120 --error-rate 0.05
+    EBAY_API_BASE=http://127.0.0.1:8765 python scripts/fetch_offers_ebay_enhanced.py
+
+Searches are matched on their full query string; unknown searches return an
+empty result.  Latency, 5xx errors and 429 throttling can be injected to
+benchmark the fetcher's concurrency, retries and caching without network.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+RECORDINGS_DIR = ROOT / "data" / "recordings"
+
+TOKEN_PATH = "/identity/v1/oauth2/token"
+SEARCH_PATH = "/buy/browse/v1/item_summary/search"
+
+
+def canonical(params: dict) -> str:
+    return json.dumps({k: str(v) for k, v in params.items()}, sort_keys=True, ensure_ascii=False)
+
+
+def load_recordings(path: pathlib.Path) -> dict[str, dict]:
+    """Return recorded bodies indexed by their canonical query parameters."""
+    index = {}
+    for f in sorted(path.glob("*.json")):
+        try:
+            data = json.loads(f.read_text("utf-8"))
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict) and isinstance(data.get("params"), dict):
+            index[canonical(data["params"])] = data.get("body") or {}
+    return index
+
+
+class StandinConfig:
+    def __init__(
+        self,
+        recordings: dict[str, dict],
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        seed: int | None = None,
+    ):
+        self.recordings = recordings
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def roll(self) -> tuple[float, float]:
+        with self.lock:
+            return self.rng.random(), self.rng.uniform(-1, 1)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = "ebay-standin/1"
+    config: StandinConfig
+
+    def log_message(self, fmt, *args):  # pragma: no cover - keep output quiet
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _delay_and_fault(self) -> bool:
+        """Sleep for the configured latency; answer with an injected error."""
+        cfg = self.config
+        roll, jitter = cfg.roll()
+        delay = max(0.0, cfg.latency_ms + jitter * cfg.jitter_ms) / 1000
+        if delay:
+            time.sleep(delay)
+        if roll < cfg.throttle_rate:
+            self._send_json(429, {"errors": [{"message": "throttled"}]}, {"Retry-After": "1"})
+            return True
+        if roll < cfg.throttle_rate + cfg.error_rate:
+            self._send_json(503, {"errors": [{"message": "injected error"}]})
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if urlsplit(self.path).path != TOKEN_PATH:
+            self._send_json(404, {"errors": [{"message": "not found"}]})
+            return
+        self._send_json(200, {"access_token": "standin-token", "expires_in": 7200})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != SEARCH_PATH:
+            self._send_json(404, {"errors": [{"message": "not found"}]})
+            return
+        if self._delay_and_fault():
+            return
+        params = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        body = self.config.recordings.get(canonical(params))
+        with self.config.lock:
+            if body is None:
+                self.config.misses += 1
+            else:
+                self.config.hits += 1
+        self._send_json(200, body if body is not None else {"total": 0, "itemSummaries": []})
+
+
+def make_server(config: StandinConfig, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    handler = type("Handler", (StandinHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local stand-in for the eBay Browse API")
+    ap.add_argument("--recordings", default=str(RECORDINGS_DIR), help="Verzeichnis mit Aufnahmen")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0, help="Antwortzeit je Suche")
+    ap.add_argument("--jitter-ms", type=float, default=0, help="zufällige Abweichung der Antwortzeit")
+    ap.add_argument("--error-rate", type=float, default=0, help="Anteil 503-Antworten (0..1)")
+    ap.add_argument("--throttle-rate", type=float, default=0, help="Anteil 429-Antworten (0..1)")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    recordings = load_recordings(pathlib.Path(args.recordings))
+    config = StandinConfig(
+        recordings,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    server = make_server(config, args.host, args.port)
+    print(f"Stand-in mit {len(recordings)} Aufnahmen auf http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{config.hits} Treffer, {config.misses} unbekannte Suchen")
+
+
+if __name__ == "__main__":
+    main()
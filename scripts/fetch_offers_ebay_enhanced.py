@@ -2,25 +2,51 @@
 # -*- coding: utf-8 -*-
 """Fetch eBay offers for each game and save to data/offers/<slug>.json
 
-- Application Access Token (client_credentials) with base scope
+- Application Access Token (client_credentials) with base scope, cached on
+  disk until it expires and fetched lazily on the first search
 - Marketplace via header (X-EBAY-C-MARKETPLACE-ID=EBAY_DE)
 - Optional EPN affiliate via X-EBAY-C-ENDUSERCTX
 - Supports per-game YAML `search_terms` (DE+EN), tries multiple queries
 - Excludes accessory items and private sellers, keeps only new-condition listings
 - Robust price detection (price / priceRange.min / currentBidPrice), EUR only
 - Filters results to the requested eBay category (default: board games)
+- Optional concurrent mode (``--workers N``) fetching games and queries in parallel
+- Token-bucket rate limit, daily call budget and retries with backoff (429/5xx)
+- On-disk response cache with TTL (``data/cache/responses``)
+- ``--incremental`` refreshes only stale games, volatile ones more often
+- Pages through results lazily and stops once enough offers are kept
+- ``--shard i/N`` / ``--slugs`` split the catalogue across parallel jobs;
+  ``--verify-shards N`` checks that all shards finished before the build
+- ``--record DIR`` / ``--replay DIR`` save or serve raw search responses for
+  offline runs; ``EBAY_API_BASE`` points the client at a local stand-in
+  (``scripts/ebay_standin_server.py``)
 """
 
-import os, json, time, datetime as dt
+import os, json, time, argparse, hashlib, tempfile, threading, zlib, datetime as dt
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any
 from urllib.parse import quote_plus
 import requests, yaml, re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 ROOT = Path(__file__).resolve().parents[1]
 CONTENT_DIR = ROOT / "content" / "games"
 DATA_DIR = ROOT / "data" / "offers"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+HISTORY_DIR = ROOT / "data" / "history"
+SHARD_DIR = DATA_DIR / "_shards"
+# Shard manifests must come from the same CI run (or be at most this old)
+SHARD_MAX_AGE_HOURS = 12
+CACHE_DIR = ROOT / "data" / "cache"
+USAGE_PATH = CACHE_DIR / "api_usage.json"
+RESPONSE_CACHE_DIR = CACHE_DIR / "responses"
+RECORDINGS_DIR = ROOT / "data" / "recordings"
+TOKEN_CACHE_PATH = CACHE_DIR / "ebay_token.json"
 
 def load_env_file(path: Path):
     if path.exists():
@@ -39,41 +65,10 @@ CSEC = os.getenv("EBAY_CLIENT_SECRET", "").strip()
 EPN_CAMPAIGN_ID = os.getenv("EPN_CAMPAIGN_ID", "").strip()      # optional for affiliate
 EPN_REFERENCE_ID = os.getenv("EPN_REFERENCE_ID", "preisradar").strip()  # optional base
 
-if not CID or not CSEC:
-    print("❌ EBAY_CLIENT_ID / EBAY_CLIENT_SECRET fehlen – breche ab.")
-    raise SystemExit(1)
-
-TOKEN_URL = "https://api.ebay.com/identity/v1/oauth2/token"
-SEARCH_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
-
-def get_token(client_id: str, client_secret: str) -> str:
-    data = {
-        "grant_type": "client_credentials",
-        "scope": "https://api.ebay.com/oauth/api_scope",
-    }
-    resp = requests.post(TOKEN_URL, data=data, auth=(client_id, client_secret), timeout=25)
-    if resp.status_code != 200:
-        print("❌ OAuth-Fehler:", resp.status_code, resp.text[:400])
-        raise SystemExit(1)
-    tok = resp.json().get("access_token")
-    if not tok:
-        print("❌ Kein access_token in OAuth-Antwort")
-        raise SystemExit(1)
-    print("✔ OAuth ok")
-    return tok
-
-TOKEN = get_token(CID, CSEC)
-
-def build_headers() -> Dict[str, str]:
-    h = {
-        "Authorization": f"Bearer {TOKEN}",
-        "Accept-Language": "de-DE",
-        "Content-Type": "application/json",
-        "X-EBAY-C-MARKETPLACE-ID": MARKETPLACE_ID,
-    }
-    if EPN_CAMPAIGN_ID:
-        h["X-EBAY-C-ENDUSERCTX"] = f"affiliateCampaignId={EPN_CAMPAIGN_ID},affiliateReferenceId={EPN_REFERENCE_ID}"
-    return h
+# Overridable to benchmark against scripts/ebay_standin_server.py
+API_BASE = os.getenv("EBAY_API_BASE", "https://api.ebay.com").strip().rstrip("/")
+TOKEN_URL = f"{API_BASE}/identity/v1/oauth2/token"
+SEARCH_URL = f"{API_BASE}/buy/browse/v1/item_summary/search"
 
 # Load external filter configuration so that the fetcher can be reused for
 # other projects without touching the code.
@@ -115,15 +110,548 @@ DEFAULT_CATEGORY_ID = str(
 
 FIXED_PRICE = "FIXED_PRICE"
 
-HEADERS = build_headers()
+# Number of parallel workers used by main(); 1 keeps the serial behaviour.
+FETCH_WORKERS = max(1, int(FILTER_CFG.get("fetch_workers", 1) or 1))
+
+# Connection pool of the shared HTTP session and transport-level retries
+HTTP_POOL_SIZE = max(1, int(FILTER_CFG.get("http_pool_size", 10) or 10))
+HTTP_RETRIES = max(0, int(FILTER_CFG.get("http_retries", 3) or 0))
+
+# Throughput limits of the Browse API and retry policy for 429/5xx answers
+RATE_LIMIT_PER_SECOND = float(FILTER_CFG.get("rate_limit_per_second", 5) or 5)
+DAILY_CALL_BUDGET = int(FILTER_CFG.get("daily_call_budget", 5000) or 0)
+MAX_RETRIES = max(0, int(FILTER_CFG.get("max_retries", 4) or 0))
+BACKOFF_BASE_SECONDS = float(FILTER_CFG.get("backoff_base_seconds", 1.0) or 1.0)
+BACKOFF_MAX_SECONDS = 120.0
+
+# Search responses are reused for this long; the cache keeps at most
+# ``cache_max_entries`` files and evicts the least recently used ones.
+CACHE_TTL_SECONDS = int(FILTER_CFG.get("cache_ttl_seconds", 900) or 0)
+CACHE_MAX_ENTRIES = int(FILTER_CFG.get("cache_max_entries", 5000) or 0)
+
+# Incremental scheduling: games whose minimum price changes on most days are
+# refreshed every ``refresh_min_hours``, stable ones every ``refresh_max_hours``.
+REFRESH_MIN_HOURS = float(FILTER_CFG.get("refresh_min_hours", 1) or 1)
+REFRESH_MAX_HOURS = float(FILTER_CFG.get("refresh_max_hours", 24) or 24)
+VOLATILITY_WINDOW_DAYS = int(FILTER_CFG.get("volatility_window_days", 30) or 30)
+RUN_CALL_BUDGET = int(FILTER_CFG.get("run_call_budget", 0) or 0)
+
+# Paging: results are sorted by price, so further pages are only requested
+# while a game still needs offers.  The Browse API allows up to 200 per page;
+# a query never takes more than MAX_PAGES_PER_QUERY requests.
+SEARCH_PAGE_SIZE = min(200, max(1, int(FILTER_CFG.get("search_page_size", 200) or 200)))
+MAX_PAGES_PER_QUERY = 3
+MAX_ITEMS_PER_QUERY = min(
+    MAX_PAGES_PER_QUERY * SEARCH_PAGE_SIZE,
+    max(1, int(FILTER_CFG.get("max_items_per_query", 400) or 400)),
+)
+
+
+class SearchError(RuntimeError):
+    """A search failed even after retrying; the game keeps its old offers."""
+
+
+class BudgetExhausted(SearchError):
+    """The daily call budget from config/filters.yaml is used up."""
+
+
+class AuthError(RuntimeError):
+    """No application token could be obtained; the whole run is aborted."""
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` requests per second.
+
+    Callers reserve a token and sleep until it becomes available, so
+    concurrent workers are spaced out evenly.  ``penalize`` halves the rate
+    after a 429 and ``reward`` slowly restores it on success.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.max_rate = max(0.01, float(rate))
+        self.rate = self.max_rate
+        self.capacity = burst if burst is not None else max(1.0, self.max_rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token and return the seconds waited for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self) -> None:
+        with self._lock:
+            self.rate = max(self.max_rate / 8, self.rate / 2)
+
+    def reward(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+class DailyBudget:
+    """Counts API calls per UTC day across runs (``data/cache/api_usage.json``)."""
+
+    def __init__(self, limit: int, path: Path):
+        self.limit = limit
+        self.path = path
+        self.day = dt.datetime.utcnow().date().isoformat()
+        self.used = 0
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(path.read_text("utf-8"))
+            if data.get("date") == self.day:
+                self.used = int(data.get("calls", 0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def consume(self) -> None:
+        with self._lock:
+            if self.limit and self.used >= self.limit:
+                raise BudgetExhausted(f"Tagesbudget von {self.limit} Aufrufen erreicht")
+            self.used += 1
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"date": self.day, "calls": self.used}), "utf-8")
+
+
+def retry_after_seconds(resp: requests.Response) -> float | None:
+    """Parse a ``Retry-After`` header given in seconds or as HTTP date."""
+    value = (resp.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - dt.datetime.now(when.tzinfo)).total_seconds())
+
+
+def build_headers(token: str) -> Dict[str, str]:
+    h = {
+        "Authorization": f"Bearer {token}",
+        "Accept-Language": "de-DE",
+        "Content-Type": "application/json",
+        "X-EBAY-C-MARKETPLACE-ID": MARKETPLACE_ID,
+    }
+    if EPN_CAMPAIGN_ID:
+        h["X-EBAY-C-ENDUSERCTX"] = f"affiliateCampaignId={EPN_CAMPAIGN_ID},affiliateReferenceId={EPN_REFERENCE_ID}"
+    return h
+
+
+class TokenProvider:
+    """Application token fetched on demand and cached in ``path``.
+
+    The token is reused until ``margin`` seconds before ``expires_in`` runs
+    out, across processes via the cache file.  ``invalidate`` drops a token
+    the API rejected (401) so the next ``get`` fetches a fresh one.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        client_id: str,
+        client_secret: str,
+        path: Path | None = TOKEN_CACHE_PATH,
+        margin: int = 300,
+    ):
+        self.session = session
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.path = path
+        self.margin = margin
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _owner(self) -> str:
+        raw = f"{TOKEN_URL} {self.client_id}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def _valid(self) -> bool:
+        return bool(self._token) and time.time() < self._expires_at - self.margin
+
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            data = json.loads(self.path.read_text("utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("client") == self._owner():
+            self._token = data.get("access_token")
+            self._expires_at = float(data.get("expires_at") or 0)
+
+    def set(self, token: str, expires_in: float) -> None:
+        """Remember ``token`` and persist it for other processes."""
+        self._token = token
+        self._expires_at = time.time() + expires_in
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"client": self._owner(), "access_token": token, "expires_at": self._expires_at}
+        tmp = self.path.with_suffix(".tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp, self.path)
+
+    def _fetch(self) -> None:
+        if not self.client_id or not self.client_secret:
+            raise AuthError("EBAY_CLIENT_ID / EBAY_CLIENT_SECRET fehlen")
+        data = {
+            "grant_type": "client_credentials",
+            "scope": "https://api.ebay.com/oauth/api_scope",
+        }
+        resp = self.session.post(
+            TOKEN_URL, data=data, auth=(self.client_id, self.client_secret), timeout=25
+        )
+        if resp.status_code != 200:
+            raise AuthError(f"OAuth-Fehler: {resp.status_code} {resp.text[:400]}")
+        body = resp.json()
+        tok = body.get("access_token")
+        if not tok:
+            raise AuthError("Kein access_token in OAuth-Antwort")
+        self.set(tok, float(body.get("expires_in") or 7200))
+        print("✔ OAuth ok")
+
+    def get(self) -> str:
+        with self._lock:
+            if not self._valid():
+                self._load()
+            if not self._valid():
+                self._fetch()
+            return self._token
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            if token != self._token:
+                return  # another thread already refreshed it
+            self._token = None
+            self._expires_at = 0.0
+            if self.path is not None:
+                self.path.unlink(missing_ok=True)
+
+
+class EbayClient:
+    """Owns one pooled keep-alive ``requests.Session`` for all eBay calls.
+
+    Every search reuses the same TCP/TLS connections instead of opening a
+    new one per request.  Connection errors are retried by the mounted
+    adapter; 429 and 5xx answers by ``search`` with exponential backoff so
+    that every attempt passes the rate limiter and shows up in ``stats``.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        pool_size: int = HTTP_POOL_SIZE,
+        retries: int = HTTP_RETRIES,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.retries = retries
+        self.limiter = RateLimiter(RATE_LIMIT_PER_SECOND)
+        self.budget = DailyBudget(DAILY_CALL_BUDGET, USAGE_PATH)
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self.session = requests.Session()
+        self.tokens = TokenProvider(self.session, client_id, client_secret)
+        self.pool_size = 0
+        self.resize_pool(pool_size)
+
+    def resize_pool(self, pool_size: int) -> None:
+        """Mount a fresh adapter keeping up to ``pool_size`` connections."""
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=0.5,
+            respect_retry_after_header=False,
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+
+    def count(self, key: str, n: float = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def search(self, params: Dict[str, str]) -> requests.Response:
+        """GET a search page, retrying 429/5xx with exponential backoff.
+
+        A 401 invalidates the cached token and is retried once with a fresh
+        one.  Raises ``SearchError`` once retries are exhausted and
+        ``BudgetExhausted`` when the daily budget is used up; other
+        responses are returned to the caller unchanged.
+        """
+        attempt = 0
+        refreshed = False
+        while True:
+            token = self.tokens.get()
+            self.budget.consume()
+            self.count("wait_s", self.limiter.acquire())
+            r = self.session.get(
+                SEARCH_URL, params=params, headers=build_headers(token), timeout=25
+            )
+            self.count("requests")
+            if r.status_code == 401 and not refreshed:
+                refreshed = True
+                self.count("token_refreshes")
+                self.tokens.invalidate(token)
+                continue
+            if r.status_code != 429 and r.status_code < 500:
+                self.limiter.reward()
+                return r
+            if r.status_code == 429:
+                self.count("throttled")
+                self.limiter.penalize()
+            else:
+                self.count("server_errors")
+            if attempt == MAX_RETRIES:
+                break
+            delay = retry_after_seconds(r)
+            if delay is None:
+                delay = BACKOFF_BASE_SECONDS * 2 ** attempt
+            delay = min(delay, BACKOFF_MAX_SECONDS)
+            self.count("retries")
+            self.count("wait_s", delay)
+            time.sleep(delay)
+            attempt += 1
+        self.count("failures")
+        raise SearchError(f"HTTP {r.status_code} nach {MAX_RETRIES + 1} Versuchen")
+
+    def summary(self) -> str:
+        s = self.stats
+        budget = f"{self.budget.used}/{self.budget.limit}" if self.budget.limit else str(self.budget.used)
+        return (
+            f"{s['requests']} Anfragen, {s['cache_hits']} aus dem Cache, {s['retries']} Wiederholungen, "
+            f"{s['throttled']}× 429, {s['server_errors']}× 5xx, {s['failures']} Fehlschläge, "
+            f"{s['wait_s']:.1f} s gewartet, Tagesbudget {budget}"
+            + (f", {s['replayed']} abgespielt / {s['replay_misses']} fehlend" if REPLAY else "")
+        )
+
+
+CLIENT = EbayClient(CID, CSEC)
+
+
+def request_key(params: Dict[str, str]) -> str:
+    """Content address of a search request.
+
+    Covers every query parameter plus the headers that change the answer
+    (marketplace, affiliate context).
+    """
+    payload = {
+        "url": SEARCH_URL,
+        "marketplace": MARKETPLACE_ID,
+        "affiliate": [EPN_CAMPAIGN_ID, EPN_REFERENCE_ID] if EPN_CAMPAIGN_ID else None,
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Stores successful search responses as ``<key>.json`` files.
+
+    Entries older than ``ttl`` seconds are ignored.  Hits refresh the file
+    mtime, which ``prune`` uses to drop the least recently used entries
+    beyond ``max_entries``.
+    """
+
+    def __init__(self, path: Path, ttl: int, max_entries: int = 0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
 
+    def _file(self, params: Dict[str, str]) -> Path:
+        return self.path / f"{request_key(params)}.json"
+
+    def get(self, params: Dict[str, str]) -> Dict[str, Any] | None:
+        if self.ttl <= 0:
+            return None
+        f = self._file(params)
+        try:
+            entry = json.loads(f.read_text("utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("stored_at", 0) > self.ttl:
+            return None
+        try:
+            os.utime(f)
+        except OSError:
+            pass
+        return entry.get("body")
+
+    def put(self, params: Dict[str, str], body: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        entry = {"stored_at": time.time(), "params": params, "body": body}
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.path, suffix=".tmp", delete=False
+        ) as fh:
+            json.dump(entry, fh, ensure_ascii=False)
+        os.replace(fh.name, self._file(params))
+
+    def prune(self) -> int:
+        """Delete expired and least recently used entries; return the count."""
+        if not self.path.exists():
+            return 0
+        now = time.time()
+        entries = []
+        for f in self.path.glob("*.json"):
+            try:
+                entries.append((f.stat().st_mtime, f))
+            except OSError:
+                pass
+        entries.sort(reverse=True)
+        removed = 0
+        for i, (mtime, f) in enumerate(entries):
+            expired = now - mtime > max(self.ttl, 0)
+            if expired or (self.max_entries and i >= self.max_entries):
+                f.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+RESPONSE_CACHE: ResponseCache | None = ResponseCache(
+    RESPONSE_CACHE_DIR, CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES
+)
+
+
+def params_key(params: Dict[str, str]) -> str:
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+class Recording:
+    """Raw search responses on disk, one ``<key>.json`` per request.
+
+    Files hold ``{"params": ..., "body": ...}`` and are keyed on the query
+    parameters only, so a recording can be replayed without credentials or
+    affiliate settings and served by ``scripts/ebay_standin_server.py``.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def save(self, params: Dict[str, str], body: Dict[str, Any]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        payload = {"params": params, "body": body}
+        (self.path / f"{params_key(params)}.json").write_text(
+            json.dumps(payload, ensure_ascii=False, indent=1), "utf-8"
+        )
+
+    def load(self, params: Dict[str, str]) -> Dict[str, Any] | None:
+        try:
+            data = json.loads((self.path / f"{params_key(params)}.json").read_text("utf-8"))
+        except (OSError, ValueError):
+            return None
+        return data.get("body")
+
+
+# Set by main() for --record / --replay
+RECORDER: Recording | None = None
+REPLAY: Recording | None = None
+
+@lru_cache(maxsize=512)
+def compile_terms(terms: tuple) -> re.Pattern | None:
+    """Compile lower-case substrings into one alternation regex.
+
+    Longer terms come first so a match reports the most specific term
+    (``expansion pack`` rather than ``expansion``).
+    """
+    uniq = sorted(set(terms), key=lambda t: (-len(t), t))
+    if not uniq:
+        return None
+    return re.compile("|".join(re.escape(t) for t in uniq))
 
 
 def looks_like_accessory(title: str, extra_terms: List[str] | None = None) -> bool:
     """Return True if title contains any generic or game-specific exclude terms."""
-    t = (title or "").lower()
-    terms = EXCLUDE_TERMS + [e.lower() for e in (extra_terms or [])]
-    return any(term in t for term in terms)
+    pattern = compile_terms(tuple(EXCLUDE_TERMS) + tuple(e.lower() for e in (extra_terms or [])))
+    return bool(pattern and pattern.search((title or "").lower()))
+
+
+def item_categories(item: Dict[str, Any]) -> set:
+    """Return all category IDs reported for an item summary."""
+    cats = set()
+    cat_id = item.get("categoryId")
+    if cat_id is not None:
+        cat_id = str(cat_id).strip()
+        if cat_id:
+            cats.add(cat_id)
+    for cat in item.get("categories", []):
+        cid = str(cat.get("categoryId") or "").strip()
+        if cid:
+            cats.add(cid)
+    return cats
+
+
+# Rejection reasons of all games in this run, printed by main()
+REJECTION_STATS: Counter = Counter()
+_REJECTION_LOCK = threading.Lock()
+
+
+class OfferFilter:
+    """Item checks of one game, compiled once before its results are scanned.
+
+    ``reason`` returns why an item summary is rejected (``None`` if it is
+    kept); ``rejected`` counts the reasons for the run statistics.
+    """
+
+    def __init__(self, category_id: str, extra_terms: List[str] | None = None):
+        self.category_id = category_id
+        self.exclude = compile_terms(
+            tuple(EXCLUDE_TERMS) + tuple(t.lower() for t in (extra_terms or []))
+        )
+        self.condition_ids = frozenset(ALLOWED_CONDITION_IDS)
+        self.seller_type = SELLER_ACCOUNT_TYPE
+        self.rejected: Counter = Counter()
+
+    def reason(self, item: Dict[str, Any]) -> str | None:
+        # Items whose categories do not include the requested one are
+        # ignored. This also discards items without category information.
+        if self.category_id and self.category_id not in item_categories(item):
+            return "category"
+        if self.exclude is not None:
+            m = self.exclude.search((item.get("title") or "").strip().lower())
+            if m:
+                return f"exclude:{m.group(0)}"
+        cond_id = str(item.get("conditionId") or "")
+        if cond_id and cond_id not in self.condition_ids:
+            cond_txt = (item.get("condition") or "").lower()
+            if "neu" not in cond_txt and "new" not in cond_txt:
+                return "condition"
+        seller = item.get("seller") or {}
+        acc_type = (seller.get("accountType") or seller.get("sellerAccountType") or "").upper()
+        if acc_type != self.seller_type:
+            return "seller"
+        return None
+
+    def reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+
+    def publish(self) -> None:
+        """Add this game's rejection counts to ``REJECTION_STATS``."""
+        with _REJECTION_LOCK:
+            REJECTION_STATS.update(self.rejected)
 
 
 def build_aspect_filter(aspects: Dict[str, List[str]]) -> str:
@@ -144,6 +672,7 @@ def search_once(
     category_id: str | None = None,
     min_price: float | None = None,
     aspect_filters: Dict[str, List[str]] | None = None,
+    offset: int = 0,
 ) -> List[Dict[str, Any]]:
     filters = [
         f"priceCurrency:{PRICE_CURRENCY}",  # enforce currency
@@ -164,19 +693,65 @@ def search_once(
         "fieldgroups": "EXTENDED",
         "filter": ",".join(filters),
     }
+    if offset:
+        params["offset"] = str(offset)
     if category_id:
         params["category_ids"] = str(category_id)
     if aspect_filters:
         af = build_aspect_filter(aspect_filters)
         if af:
             params["aspect_filter"] = af
-    r = requests.get(SEARCH_URL, params=params, headers=HEADERS, timeout=25)
+    if REPLAY is not None:
+        body = REPLAY.load(params)
+        CLIENT.count("replayed" if body is not None else "replay_misses")
+        return (body or {}).get("itemSummaries") or []
+    cache = RESPONSE_CACHE
+    body = cache.get(params) if cache else None
+    if body is not None:
+        CLIENT.count("cache_hits")
+        return body.get("itemSummaries") or []
+    try:
+        r = CLIENT.search(params)
+    except SearchError as exc:
+        raise SearchError(f"Suche '{query}' fehlgeschlagen: {exc}") from exc
     if r.status_code != 200:
         print(f"  ⚠ Suche '{query}' fehlgeschlagen:", r.status_code, r.text[:300])
         return []
-    items = r.json().get("itemSummaries") or []
+    body = r.json()
+    if cache:
+        cache.put(params, body)
+    if RECORDER is not None:
+        RECORDER.save(params, body)
+    items = body.get("itemSummaries") or []
     return items
 
+def search_pages(
+    query: str,
+    page_size: int | None = None,
+    max_items: int | None = None,
+    first_page=None,
+    **kwargs,
+):
+    """Yield result pages for ``query`` until a short page or ``max_items``.
+
+    Pages are requested on demand, so a consumer that stops iterating stops
+    the downloads too.  ``first_page`` may be a list or a future of an
+    already issued request for offset 0.
+    """
+    page_size = page_size or SEARCH_PAGE_SIZE
+    max_items = max_items or MAX_ITEMS_PER_QUERY
+    offset = 0
+    while offset < max_items:
+        limit = min(page_size, max_items - offset)
+        if offset == 0 and first_page is not None:
+            items = first_page.result() if hasattr(first_page, "result") else first_page
+        else:
+            items = search_once(query, limit=limit, offset=offset, **kwargs)
+        yield items
+        if len(items) < limit:
+            return
+        offset += limit
+
 def pick_price_eur(item) -> float:
     # 1) Fixpreis
     price = item.get("price")
@@ -244,7 +819,18 @@ def queries_for(game: Dict[str, Any]) -> List[str]:
             out.append(s2)
     return out[:6]
 
-def fetch_for_game(game: Dict[str, Any], max_keep: int = 100) -> List[Dict[str, Any]]:
+def fetch_for_game(
+    game: Dict[str, Any],
+    max_keep: int = 100,
+    executor: ThreadPoolExecutor | None = None,
+) -> List[Dict[str, Any]]:
+    """Return filtered offers for ``game``.
+
+    Result pages are consumed lazily and no further page is requested once
+    ``max_keep`` offers are collected.  With an ``executor`` the first page
+    of every query is requested up front; results are still consumed in
+    query order so the kept offers do not depend on timing.
+    """
     slug = game.get("slug")
     if not slug:
         return []
@@ -255,6 +841,7 @@ def fetch_for_game(game: Dict[str, Any], max_keep: int = 100) -> List[Dict[str,
     price_filter = game.get("price_filter") or {}
     aspect_filters = game.get("aspect_filters") or None
     exclude_terms = [t.lower() for t in game.get("exclude_keywords", []) if isinstance(t, str)]
+    flt = OfferFilter(category_id, exclude_terms)
     try:
         min_price = float(price_filter.get("min"))
     except (TypeError, ValueError):
@@ -263,13 +850,26 @@ def fetch_for_game(game: Dict[str, Any], max_keep: int = 100) -> List[Dict[str,
     offers: List[Dict[str, Any]] = []
     seen = set()
 
-    for q in queries_for(game):
-        items = search_once(
-            q,
-            limit=200,
-            category_id=category_id,
-            min_price=min_price,
-            aspect_filters=aspect_filters,
+    queries = queries_for(game)
+    search_kwargs = {
+        "category_id": category_id,
+        "min_price": min_price,
+        "aspect_filters": aspect_filters,
+    }
+    pending = []
+    if executor is not None:
+        first_limit = min(SEARCH_PAGE_SIZE, MAX_ITEMS_PER_QUERY)
+        pending = [
+            executor.submit(search_once, q, limit=first_limit, **search_kwargs)
+            for q in queries
+        ]
+
+    for i, q in enumerate(queries):
+        first = pending[i] if pending else None
+        items = (
+            it
+            for page in search_pages(q, first_page=first, **search_kwargs)
+            for it in page
         )
         search_url = f"https://www.ebay.de/sch/i.html?_nkw={quote_plus(q)}"
         if category_id:
@@ -277,41 +877,24 @@ def fetch_for_game(game: Dict[str, Any], max_keep: int = 100) -> List[Dict[str,
         for it in items:
             iid = it.get("itemId")
             if not iid or iid in seen:
+                flt.reject("duplicate" if iid else "no_id")
                 continue
-            # Collect all category IDs reported for the item. If none match the
-            # requested category, the result is ignored. This also discards
-            # items that do not expose any category information at all.
-            item_cats = set()
-            cat_id_item = it.get("categoryId")
-            if cat_id_item is not None:
-                cat_id_item = str(cat_id_item).strip()
-                if cat_id_item:
-                    item_cats.add(cat_id_item)
-            for cat in it.get("categories", []):
-                cid = str(cat.get("categoryId") or "").strip()
-                if cid:
-                    item_cats.add(cid)
-            if category_id and category_id not in item_cats:
+            reason = flt.reason(it)
+            if reason:
+                flt.reject(reason)
                 continue
             price = pick_price_eur(it)
             if price is None or price <= 0:
+                flt.reject("price")
                 continue
-            shipping = pick_shipping_eur(it)
-            total = price + shipping if price is not None else None
             url = build_url(it, slug)
             if not url:
+                flt.reject("url")
                 continue
+            shipping = pick_shipping_eur(it)
+            total = price + shipping
             title = (it.get("title") or "").strip()
-            if looks_like_accessory(title, exclude_terms):
-                continue
-            cond_id = str(it.get("conditionId") or "")
-            cond_txt = (it.get("condition") or "").lower()
-            if cond_id and cond_id not in ALLOWED_CONDITION_IDS and "neu" not in cond_txt and "new" not in cond_txt:
-                continue
             seller = it.get("seller") or {}
-            acc_type = (seller.get("accountType") or seller.get("sellerAccountType") or "").upper()
-            if acc_type != SELLER_ACCOUNT_TYPE:
-                continue
             shop = seller.get("username") or "eBay"
             img = high_res_image((it.get("image") or {}).get("imageUrl"))
             desc = (it.get("shortDescription") or it.get("subtitle") or "").strip()
@@ -335,6 +918,9 @@ def fetch_for_game(game: Dict[str, Any], max_keep: int = 100) -> List[Dict[str,
         if len(offers) >= max_keep:
             break
 
+    for f in pending:
+        f.cancel()
+    flt.publish()
     offers.sort(key=lambda x: (x.get("total_eur") if x.get("total_eur") is not None else 1e9))
     return offers[:max_keep]
 
@@ -347,28 +933,366 @@ def load_games() -> List[Dict[str, Any]]:
                 games.append(g)
     return games
 
-def main():
-    games = load_games()
+def last_fetched_at(slug: str) -> dt.datetime | None:
+    """Return ``fetched_at`` of the stored offers for ``slug`` (UTC, naive)."""
+    try:
+        data = json.loads((DATA_DIR / f"{slug}.json").read_text("utf-8"))
+        ts = data.get("fetched_at") if isinstance(data, dict) else None
+        return dt.datetime.fromisoformat(ts.replace("Z", "")) if ts else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def price_volatility(slug: str, days: int = VOLATILITY_WINDOW_DAYS) -> float:
+    """Share of days (0..1) on which the daily minimum moved by more than 1 %."""
+    path = HISTORY_DIR / f"{slug}.jsonl"
+    if not path.exists():
+        return 0.0
+    cutoff = (dt.date.today() - dt.timedelta(days=days)).isoformat()
+    per_day: Dict[str, float] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            x = json.loads(line)
+            val = float(x.get("min"))
+        except (ValueError, TypeError, AttributeError):
+            continue
+        day = x.get("date") or ""
+        if day >= cutoff:
+            per_day[day] = min(val, per_day.get(day, val))
+    vals = [per_day[d] for d in sorted(per_day)]
+    if len(vals) < 2:
+        return 0.0
+    moves = sum(1 for a, b in zip(vals, vals[1:]) if a and abs(b - a) / a > 0.01)
+    return moves / (len(vals) - 1)
+
+def refresh_interval_hours(volatility: float) -> float:
+    return REFRESH_MAX_HOURS - (REFRESH_MAX_HOURS - REFRESH_MIN_HOURS) * volatility
+
+def incremental_cache_ttl() -> int:
+    """Cache TTL for ``--incremental``: well below the shortest refresh interval."""
+    return int(REFRESH_MIN_HOURS * 3600 / 4)
+
+def calls_per_query() -> int:
+    """Upper bound of search requests one query can cost (its pages)."""
+    return max(1, -(-MAX_ITEMS_PER_QUERY // SEARCH_PAGE_SIZE))
+
+def plan_refresh(
+    games: List[Dict[str, Any]],
+    call_budget: int | None = None,
+    now: dt.datetime | None = None,
+) -> List[Dict[str, Any]]:
+    """Pick the games that are due for a refresh within ``call_budget``.
+
+    ``call_budget=None`` means no limit; ``0`` plans nothing.
+
+    A game is due once its offers are older than its volatility-dependent
+    interval; the most overdue games (never fetched first) win the budget.
+    Each game is charged the worst case of ``calls_per_query()`` calls per
+    query.  The returned list keeps catalogue order.
+    """
+    now = now or dt.datetime.utcnow()
+    due = []
+    for i, g in enumerate(games):
+        last = last_fetched_at(g["slug"])
+        interval = refresh_interval_hours(price_volatility(g["slug"]))
+        if last is None:
+            overdue = float("inf")
+        else:
+            overdue = (now - last).total_seconds() / 3600 / max(interval, 0.01)
+        if overdue >= 1:
+            due.append((overdue, i, g))
+    due.sort(key=lambda x: (-x[0], x[1]))
+    picked, spent = [], 0
+    for _, i, g in due:
+        cost = max(1, len(queries_for(g))) * calls_per_query()
+        if call_budget is not None and spent + cost > call_budget:
+            continue
+        spent += cost
+        picked.append((i, g))
+    return [g for _, g in sorted(picked, key=lambda x: x[0])]
+
+def shard_of(slug: str, count: int) -> int:
+    """Stable shard index of ``slug`` (independent of PYTHONHASHSEED)."""
+    return zlib.crc32(slug.encode("utf-8")) % count
+
+def parse_shard(value: str) -> tuple:
+    """Parse ``i/N`` (0-based) into ``(i, N)``."""
+    try:
+        idx, count = (int(x) for x in value.split("/", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Format: i/N, z. B. 0/4")
+    if count < 1 or not 0 <= idx < count:
+        raise argparse.ArgumentTypeError("Shard muss 0 <= i < N erfüllen")
+    return idx, count
+
+def select_games(
+    games: List[Dict[str, Any]],
+    shard: tuple | None = None,
+    slugs: List[str] | None = None,
+) -> List[Dict[str, Any]]:
+    if slugs:
+        wanted = set(slugs)
+        games = [g for g in games if g["slug"] in wanted]
+    if shard:
+        idx, count = shard
+        games = [g for g in games if shard_of(g["slug"], count) == idx]
+    return games
+
+def shard_manifest_path(idx: int, count: int) -> Path:
+    return SHARD_DIR / f"shard-{idx}-of-{count}.json"
+
+def default_run_id() -> str:
+    return os.getenv("FETCH_RUN_ID") or os.getenv("GITHUB_RUN_ID") or ""
+
+def write_shard_manifest(
+    idx: int, count: int, done: List[str], failed: List[str], run_id: str = ""
+) -> None:
+    """Record which slugs shard ``idx`` handled; read by ``verify_shards``."""
+    SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "shard": idx,
+        "count": count,
+        "run_id": run_id,
+        "finished_at": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+        "done": sorted(done),
+        "failed": sorted(failed),
+    }
+    shard_manifest_path(idx, count).write_text(json.dumps(payload, indent=2), "utf-8")
+
+def verify_shards(
+    count: int,
+    games: List[Dict[str, Any]],
+    run_id: str = "",
+    allow_failed: bool = False,
+    now: dt.datetime | None = None,
+) -> List[str]:
+    """Return problems preventing a build from ``count`` merged shards.
+
+    With a ``run_id`` every manifest must carry it; without one, manifests
+    older than ``SHARD_MAX_AGE_HOURS`` count as left over from an earlier
+    run.  Failed games are problems unless ``allow_failed``.
+    """
+    now = now or dt.datetime.utcnow()
+    problems = []
+    expected = {g["slug"] for g in games}
+    covered = set()
+    accepted = 0
+    for idx in range(count):
+        path = shard_manifest_path(idx, count)
+        try:
+            data = json.loads(path.read_text("utf-8"))
+        except (OSError, ValueError):
+            problems.append(f"Shard {idx}/{count} fehlt ({path.name})")
+            continue
+        if run_id:
+            if data.get("run_id") != run_id:
+                problems.append(
+                    f"Shard {idx}/{count} stammt aus Lauf {data.get('run_id') or '?'}, nicht {run_id}"
+                )
+                continue
+        else:
+            try:
+                finished = dt.datetime.fromisoformat(str(data.get("finished_at")).replace("Z", ""))
+            except ValueError:
+                finished = None
+            if finished is None or now - finished > dt.timedelta(hours=SHARD_MAX_AGE_HOURS):
+                problems.append(f"Shard {idx}/{count} ist veraltet (finished_at {data.get('finished_at')})")
+                continue
+        accepted += 1
+        failed = data.get("failed") or []
+        covered.update(data.get("done") or [])
+        if allow_failed:
+            covered.update(failed)
+        elif failed:
+            problems.append(
+                f"Shard {idx}/{count}: {len(failed)} Spiele fehlgeschlagen: {', '.join(failed[:10])}"
+            )
+    if accepted:
+        missing = sorted(expected - covered)
+        if missing:
+            problems.append(f"{len(missing)} Spiele in keinem Shard: {', '.join(missing[:10])}")
+    return problems
+
+def fetch_game_safe(game, executor=None):
+    """Return ``(offers, error)``; ``offers`` is None if a search failed."""
+    try:
+        return fetch_for_game(game, max_keep=100, executor=executor), None
+    except SearchError as exc:
+        return None, exc
+
+def fetch_all(games: List[Dict[str, Any]], workers: int = 1):
+    """Yield ``(game, offers, error)`` in catalogue order.
+
+    ``workers > 1`` fetches games concurrently.  Searches run in their own
+    pool so game tasks waiting on their queries can never starve it.
+    Pacing is left to the client's rate limiter.
+    """
+    if workers <= 1:
+        for g in games:
+            yield (g, *fetch_game_safe(g))
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search") as searches, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="game") as pool:
+        futures = [pool.submit(fetch_game_safe, g, searches) for g in games]
+        try:
+            for g, fut in zip(games, futures):
+                yield (g, *fut.result())
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=FETCH_WORKERS,
+        help="parallele Anfragen (Standard: fetch_workers aus config/filters.yaml)",
+    )
+    ap.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=None,
+        help="Cache-Lebensdauer in Sekunden (Standard: cache_ttl_seconds)",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Antwort-Cache nicht verwenden")
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="nur fällige Spiele aktualisieren (volatile Preise häufiger)",
+    )
+    ap.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help="nur Spiele dieses Shards (stabiler Hash des Slugs) abrufen",
+    )
+    ap.add_argument("--slugs", default="", help="kommagetrennte Liste von Slugs")
+    ap.add_argument(
+        "--verify-shards",
+        type=int,
+        default=0,
+        metavar="N",
+        help="prüfen, ob alle N Shards vollständig sind, und beenden",
+    )
+    ap.add_argument(
+        "--run-id",
+        default=default_run_id(),
+        help="Kennung des CI-Laufs für Shard-Manifeste (Standard: FETCH_RUN_ID/GITHUB_RUN_ID)",
+    )
+    ap.add_argument(
+        "--allow-failed",
+        action="store_true",
+        help="--verify-shards: fehlgeschlagene Spiele nicht als Fehler werten",
+    )
+    ap.add_argument(
+        "--record",
+        nargs="?",
+        const=str(RECORDINGS_DIR),
+        default=None,
+        metavar="DIR",
+        help="rohe Suchantworten speichern (Standard: data/recordings)",
+    )
+    ap.add_argument(
+        "--replay",
+        nargs="?",
+        const=str(RECORDINGS_DIR),
+        default=None,
+        metavar="DIR",
+        help="gespeicherte Antworten statt der eBay-API verwenden (offline)",
+    )
+    ap.add_argument(
+        "--budget",
+        type=int,
+        default=RUN_CALL_BUDGET,
+        help="max. API-Aufrufe pro Lauf im inkrementellen Modus (0 = unbegrenzt)",
+    )
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    global RECORDER, REPLAY
+    started = time.perf_counter()
+    args = parse_args(argv)
+    if args.verify_shards:
+        problems = verify_shards(
+            args.verify_shards, load_games(), run_id=args.run_id, allow_failed=args.allow_failed,
+        )
+        for p in problems:
+            print("❌", p)
+        if problems:
+            raise SystemExit(1)
+        print(f"✔ Alle {args.verify_shards} Shards vollständig.")
+        return
+    if args.replay:
+        REPLAY = Recording(Path(args.replay))
+        print(f"▶ Replay aus {args.replay} – keine Netzwerkzugriffe.")
+    elif not CID or not CSEC:
+        print("❌ EBAY_CLIENT_ID / EBAY_CLIENT_SECRET fehlen – breche ab.")
+        raise SystemExit(1)
+    if args.record:
+        RECORDER = Recording(Path(args.record))
+    workers = max(1, args.workers)
+    if workers > CLIENT.pool_size:
+        CLIENT.resize_pool(workers)
+    if RESPONSE_CACHE is not None:
+        if args.no_cache or args.record or args.replay:
+            RESPONSE_CACHE.ttl = 0
+        elif args.cache_ttl is not None:
+            RESPONSE_CACHE.ttl = args.cache_ttl
+        if args.incremental:
+            # a due game must not be re-stamped with offers cached before it was due
+            RESPONSE_CACHE.ttl = min(RESPONSE_CACHE.ttl, incremental_cache_ttl())
+    slugs = [x.strip() for x in args.slugs.split(",") if x.strip()]
+    games = select_games(load_games(), shard=args.shard, slugs=slugs)
     if not games:
         print("⚠ Keine Spiele gefunden unter", CONTENT_DIR)
     if not EPN_CAMPAIGN_ID:
         print("⚠ EPN_CAMPAIGN_ID fehlt – Affiliate-Tracking wird (noch) nicht angehängt.")
-    updated = 0
-    for g in games:
-        slug = g["slug"]
-        offers = fetch_for_game(g, max_keep=100)
-        outp = DATA_DIR / f"{slug}.json"
-        outp.parent.mkdir(parents=True, exist_ok=True)
-        meta = {
-            "fetched_at": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
-            "offers": offers,
-        }
-        with outp.open("w", encoding="utf-8") as f:
-            json.dump(meta, f, ensure_ascii=False, indent=2)
-        print(f"✔ {slug}: {len(offers)} Angebote gespeichert.")
-        updated += 1
-        time.sleep(0.2)  # freundlich zur API
-    print(f"Fertig. {updated} Spiele aktualisiert.")
+    selected = [g["slug"] for g in games]
+    if args.incremental:
+        budget = args.budget or None  # --budget 0 = unlimited
+        if CLIENT.budget.limit:
+            left = max(0, CLIENT.budget.limit - CLIENT.budget.used)
+            budget = left if budget is None else min(budget, left)
+        total = len(games)
+        games = plan_refresh(games, call_budget=budget)
+        print(f"Plan: {len(games)} von {total} Spielen werden aktualisiert.")
+    updated = failed = 0
+    failed_slugs: List[str] = []
+    try:
+        for g, offers, error in fetch_all(games, workers=workers):
+            slug = g["slug"]
+            if error is not None:
+                print(f"⚠ {slug}: {error} – bisherige Angebote bleiben erhalten.")
+                failed += 1
+                failed_slugs.append(slug)
+                continue
+            outp = DATA_DIR / f"{slug}.json"
+            outp.parent.mkdir(parents=True, exist_ok=True)
+            meta = {
+                "fetched_at": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+                "offers": offers,
+            }
+            with outp.open("w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            print(f"✔ {slug}: {len(offers)} Angebote gespeichert.")
+            updated += 1
+    except AuthError as exc:
+        print("❌", exc)
+        raise SystemExit(1)
+    finally:
+        CLIENT.budget.save()
+    if args.shard:
+        done = [s for s in selected if s not in set(failed_slugs)]
+        write_shard_manifest(*args.shard, done=done, failed=failed_slugs, run_id=args.run_id)
+    if RESPONSE_CACHE is not None and RESPONSE_CACHE.ttl > 0:
+        RESPONSE_CACHE.prune()
+    print("Statistik:", CLIENT.summary())
+    if REJECTION_STATS:
+        top = ", ".join(f"{k} {v}" for k, v in REJECTION_STATS.most_common(10))
+        print("Verworfen:", top)
+    elapsed = time.perf_counter() - started
+    print(f"Fertig. {updated} Spiele aktualisiert, {failed} fehlgeschlagen ({elapsed:.1f} s).")
 
 if __name__ == "__main__":
     main()
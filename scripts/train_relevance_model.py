@@ -6,16 +6,36 @@ The script expects labelled offers in ``data/labels`` generated via
 pipeline is used.  The resulting model is saved to
 ``data/relevance_model.pkl`` and automatically used during ``build.py`` to
 filter offers.
+
+With ``--streaming`` the offers are read as a stream and fed in batches to a
+stateless ``HashingVectorizer`` and an ``SGDClassifier`` trained with
+``partial_fit``, so memory stays flat and the model file holds no
+vocabulary.  The examples are shuffled (seeded, per epoch) through a bounded
+buffer.  ``--update`` continues such a model with only the labels added
+since it was last trained; the model remembers which label files it has
+seen and an 8-byte hash per trained example, not the examples themselves.
+
+``--evaluate`` reports stratified cross-validated precision/recall, fit
+time, scoring throughput and model size instead of saving a model.
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
+import itertools
 import json
 import pathlib
+import random
+import time
 
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import precision_score, recall_score
+from sklearn.model_selection import StratifiedKFold
 
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
@@ -23,10 +43,22 @@ OFFERS_DIR = ROOT / "data" / "offers"
 LABEL_DIR = ROOT / "data" / "labels"
 MODEL_PATH = ROOT / "data" / "relevance_model.pkl"
 
+HASH_FEATURES = 2 ** 18
+BATCH_SIZE = 1000
+SHUFFLE_BATCHES = 10  # batches held in the shuffle buffer
+SEED = 0
 
-def load_dataset():
-    texts, labels = [], []
-    for label_file in LABEL_DIR.glob("*.json"):
+
+def iter_examples(label_files=None):
+    """Yield ``(key, text, label)`` for every labelled offer, game by game.
+
+    ``key`` identifies the offer and its label (``slug:item_id:label``) so an
+    updated model can skip examples it was already trained on.
+    ``label_files`` defaults to all files in ``LABEL_DIR``.
+    """
+    if label_files is None:
+        label_files = sorted(LABEL_DIR.glob("*.json"))
+    for label_file in label_files:
         slug = label_file.stem
         offers_file = OFFERS_DIR / f"{slug}.json"
         if not offers_file.exists():
@@ -55,22 +87,241 @@ def load_dataset():
                 str(offer.get(k, ""))
                 for k in ["title", "subtitle", "condition", "shop", "description"]
             )
-            texts.append(text)
-            labels.append(1 if label_map[item_id] else 0)
+            label = 1 if label_map[item_id] else 0
+            yield f"{slug}:{item_id}:{label}", text, label
+
+
+def load_dataset():
+    texts, labels = [], []
+    for _, text, label in iter_examples():
+        texts.append(text)
+        labels.append(label)
     return texts, labels
 
 
-def main():
-    texts, y = load_dataset()
-    if not texts:
-        print("No labelled data found")
-        return
+def fit_full(texts, y):
     vec = TfidfVectorizer(max_features=5000)
     X = vec.fit_transform(texts)
     model = LogisticRegression(max_iter=1000)
     model.fit(X, y)
+    return {"vectorizer": vec, "model": model}
+
+
+def train_full():
+    texts, y = load_dataset()
+    if not texts:
+        return None
+    return fit_full(texts, y)
+
+
+def fit_streaming(texts, y, batch_size=BATCH_SIZE, seed=SEED):
+    """Fit a fresh streaming model on in-memory data, batch by batch."""
+    bundle = make_streaming_model()
+    order = list(range(len(texts)))
+    random.Random(seed).shuffle(order)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        X = bundle["vectorizer"].transform([texts[i] for i in idx])
+        bundle["model"].partial_fit(X, [y[i] for i in idx], classes=[0, 1])
+    return bundle
+
+
+def evaluate(texts, y, streaming=False, folds=5, batch_size=BATCH_SIZE):
+    """Cross-validate the model and measure its cost.
+
+    Returns a dict with mean precision/recall of the relevant class, mean
+    fit time, scoring throughput (offers/second through ``transform`` and
+    ``predict_proba``, as in build.py) and the pickled size of a model
+    trained on all data; None if each class has fewer than two examples.
+    """
+    folds = min(folds, y.count(0), y.count(1))
+    if folds < 2:
+        return None
+    fit = (lambda t, l: fit_streaming(t, l, batch_size)) if streaming else fit_full
+    skf = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+    precision, recall, fit_times = [], [], []
+    for train, test in skf.split(texts, y):
+        started = time.perf_counter()
+        bundle = fit([texts[i] for i in train], [y[i] for i in train])
+        fit_times.append(time.perf_counter() - started)
+        X = bundle["vectorizer"].transform([texts[i] for i in test])
+        pred = bundle["model"].predict(X)
+        truth = [y[i] for i in test]
+        precision.append(precision_score(truth, pred, zero_division=0))
+        recall.append(recall_score(truth, pred, zero_division=0))
+
+    bundle = fit(texts, y)
+    started = time.perf_counter()
+    bundle["model"].predict_proba(bundle["vectorizer"].transform(texts))
+    scoring = time.perf_counter() - started
+    buf = io.BytesIO()
+    joblib.dump(sparsify(bundle), buf)
+    return {
+        "examples": len(texts),
+        "relevant": sum(y),
+        "folds": folds,
+        "precision": sum(precision) / folds,
+        "recall": sum(recall) / folds,
+        "fit_seconds": sum(fit_times) / folds,
+        "offers_per_second": len(texts) / scoring if scoring else float("inf"),
+        "model_bytes": buf.getbuffer().nbytes,
+    }
+
+
+def make_streaming_model():
+    return {
+        "vectorizer": HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False),
+        "model": SGDClassifier(loss="log_loss", random_state=0),
+        # watermark: label file stamps and sorted hashes of trained example keys
+        "trained": {"files": {}, "hashes": np.empty(0, dtype=np.uint64)},
+    }
+
+
+def example_hash(key):
+    """64-bit hash of an example key, stable across runs."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def file_stamp(label_file):
+    """Size and mtime of a label file and its offers; changes on new labels."""
+    stamp = []
+    for path in (label_file, OFFERS_DIR / label_file.name):
+        try:
+            st = path.stat()
+            stamp.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def shuffled(examples, rng, buffer_size):
+    """Shuffle a stream through a buffer of ``buffer_size`` items."""
+    buf = []
+    for ex in examples:
+        if len(buf) < buffer_size:
+            buf.append(ex)
+            continue
+        i = rng.randrange(buffer_size)
+        yield buf[i]
+        buf[i] = ex
+    rng.shuffle(buf)
+    yield from buf
+
+
+def sparsify(bundle):
+    """Store SGD weights sparsely; a dense 2**18 coef_ would be ~2 MB."""
+    if isinstance(bundle["model"], SGDClassifier):
+        bundle["model"].sparsify()
+    return bundle
+
+
+def train_streaming(bundle=None, batch_size=BATCH_SIZE, epochs=1, seed=SEED):
+    """Train (or continue) a hashing + SGD model batch by batch.
+
+    Only label files changed since the last run are read, and examples whose
+    key hash is already in the watermark are skipped.  Each epoch visits the
+    files in a new order and shuffles the examples through a buffer of
+    ``SHUFFLE_BATCHES`` batches.  Returns ``(bundle, n)`` with the number of
+    new examples used.
+    """
+    bundle = bundle or make_streaming_model()
+    trained = bundle["trained"]
+    seen = trained["hashes"]
+    stamps = {f: file_stamp(f) for f in sorted(LABEL_DIR.glob("*.json"))}
+    todo = [f for f, stamp in stamps.items() if trained["files"].get(f.stem) != stamp]
+
+    def fresh(label_files):
+        for key, text, label in iter_examples(label_files):
+            h = np.uint64(example_hash(key))
+            i = np.searchsorted(seen, h)
+            if i == len(seen) or seen[i] != h:
+                yield h, text, label
+
+    rng = random.Random(seed)
+    new = []
+    for epoch in range(epochs):
+        rng.shuffle(todo)
+        examples = shuffled(fresh(todo), rng, SHUFFLE_BATCHES * batch_size)
+        while True:
+            batch = list(itertools.islice(examples, batch_size))
+            if not batch:
+                break
+            hashes, texts, y = zip(*batch)
+            X = bundle["vectorizer"].transform(texts)
+            bundle["model"].partial_fit(X, y, classes=[0, 1])
+            if epoch == 0:
+                new.extend(hashes)
+    trained["hashes"] = np.union1d(seen, np.array(new, dtype=np.uint64))
+    trained["files"].update((f.stem, stamps[f]) for f in todo)
+    return bundle, len(new)
+
+
+def load_streaming_model(path=MODEL_PATH):
+    if not path.exists():
+        return None
+    bundle = joblib.load(path)
+    if not isinstance(bundle, dict) or "trained" not in bundle:
+        raise SystemExit(f"{path} is not a streaming model, retrain with --streaming")
+    bundle["model"].densify()
+    return bundle
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Train the offer relevance model")
+    ap.add_argument(
+        "--streaming",
+        action="store_true",
+        help="out-of-core training with HashingVectorizer + SGDClassifier",
+    )
+    ap.add_argument(
+        "--update",
+        action="store_true",
+        help="continue the existing streaming model with new labels only",
+    )
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--epochs", type=int, default=1, help="passes over the new labels")
+    ap.add_argument("--seed", type=int, default=SEED, help="seed for shuffling")
+    ap.add_argument(
+        "--evaluate",
+        action="store_true",
+        help="cross-validate and benchmark the model instead of saving it",
+    )
+    ap.add_argument("--folds", type=int, default=5)
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.evaluate:
+        texts, y = load_dataset()
+        report = evaluate(texts, y, args.streaming, args.folds, args.batch_size)
+        if report is None:
+            print("Need at least two relevant and two irrelevant labelled offers")
+            return
+        kind = "streaming (hashing + SGD)" if args.streaming else "full (tf-idf + logistic regression)"
+        print(f"Model: {kind}, {report['folds']}-fold stratified CV")
+        print(f"Examples: {report['examples']} ({report['relevant']} relevant)")
+        print(f"Precision: {report['precision']:.3f}  Recall: {report['recall']:.3f}")
+        print(f"Fit time: {report['fit_seconds'] * 1000:.1f} ms per fold")
+        print(f"Scoring: {report['offers_per_second']:,.0f} offers/s")
+        print(f"Model size: {report['model_bytes'] / 1024:.1f} KiB")
+        return
+    if args.streaming or args.update:
+        bundle = load_streaming_model() if args.update else None
+        bundle, n = train_streaming(bundle, args.batch_size, args.epochs, args.seed)
+        total = len(bundle["trained"]["hashes"])
+        if not n:
+            print("No new labelled data found" if total else "No labelled data found")
+            return
+        print(f"Trained on {n} new offers ({total} in total)")
+        sparsify(bundle)
+    else:
+        bundle = train_full()
+        if bundle is None:
+            print("No labelled data found")
+            return
     MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump({"vectorizer": vec, "model": model}, MODEL_PATH)
+    joblib.dump(bundle, MODEL_PATH)
     print(f"Saved model to {MODEL_PATH}")
 
 
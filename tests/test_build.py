@@ -1,6 +1,9 @@
+import os
 import sys
 from pathlib import Path
 
+import pytest
+
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from scripts.build import is_relevant, build_epn_search_url, DEFAULT_EBAY_CATEGORY_ID
@@ -16,3 +19,502 @@ def test_build_epn_search_url_adds_category():
     game = {"slug": "catan", "search_terms": ["Catan"]}
     url = build_epn_search_url(game)
     assert f"_sacat={DEFAULT_EBAY_CATEGORY_ID}" in url
+
+
+def test_render_games_parallel_matches_serial(tmp_path, monkeypatch):
+    from scripts import build
+
+    monkeypatch.setattr(build, "DATA", tmp_path / "offers")
+    monkeypatch.setattr(build, "HIST_DIR", tmp_path / "history")
+    monkeypatch.setattr(build, "LABEL_DIR", tmp_path / "labels")
+    monkeypatch.setattr(build, "HISTORY_DB", tmp_path / "history.sqlite")
+    paths = sorted(build.CONTENT.glob("*.yaml"))[:4]
+    games = {p: build.load_yaml(p) for p in paths}
+
+    outputs = {}
+    for jobs in (1, 2):
+        dist = tmp_path / f"dist{jobs}"
+        monkeypatch.setattr(build, "DIST", dist)
+        assert build.render_games(games, "https://example.org", jobs=jobs) == []
+        outputs[jobs] = {
+            p.relative_to(dist).as_posix(): p.read_text("utf-8")
+            for p in dist.rglob("index.html")
+        }
+    assert len(outputs[1]) == len(paths)
+    assert outputs[1] == outputs[2]
+
+
+def test_incremental_build_skips_unchanged_pages(tmp_path, monkeypatch):
+    import shutil
+    from scripts import build
+
+    content = tmp_path / "games"
+    content.mkdir()
+    for p in sorted(build.CONTENT.glob("*.yaml"))[:3]:
+        shutil.copy(p, content / p.name)
+    monkeypatch.setattr(build, "CONTENT", content)
+    monkeypatch.setattr(build, "DATA", tmp_path / "offers")
+    monkeypatch.setattr(build, "HIST_DIR", tmp_path / "history")
+    monkeypatch.setattr(build, "LABEL_DIR", tmp_path / "labels")
+    monkeypatch.setattr(build, "DIST", tmp_path / "dist")
+    monkeypatch.setattr(build, "CATALOGUE_CACHE", tmp_path / "catalogue.pickle")
+    monkeypatch.setattr(build, "HISTORY_DB", tmp_path / "history.sqlite")
+
+    rendered = []
+    render_game = build.render_game
+
+    def spy(game, site_url, data):
+        rendered.append(game["slug"])
+        return render_game(game, site_url, data)
+
+    monkeypatch.setattr(build, "render_game", spy)
+
+    build.main([])
+    assert len(rendered) == 3
+    rendered.clear()
+
+    build.main(["--incremental"])
+    assert rendered == []
+
+    first, second, third = sorted(content.glob("*.yaml"))
+    build.DATA.mkdir()
+    (build.DATA / f"{first.stem}.json").write_text('{"offers": []}', "utf-8")
+    third.unlink()
+    build.main(["--incremental"])
+    assert rendered == [first.stem]
+    assert not (build.DIST / "spiel" / third.stem).exists()
+    assert (build.DIST / "spiel" / second.stem / "index.html").exists()
+
+
+def test_incremental_build_tracks_pages_by_slug(tmp_path, monkeypatch):
+    import shutil
+    from scripts import build
+
+    content = tmp_path / "games"
+    content.mkdir()
+    source = sorted(build.CONTENT.glob("*.yaml"))[0]
+    slug = build.load_yaml(source)["slug"]
+    shutil.copy(source, content / "renamed-file.yaml")
+    monkeypatch.setattr(build, "CONTENT", content)
+    monkeypatch.setattr(build, "DATA", tmp_path / "offers")
+    monkeypatch.setattr(build, "HIST_DIR", tmp_path / "history")
+    monkeypatch.setattr(build, "LABEL_DIR", tmp_path / "labels")
+    monkeypatch.setattr(build, "DIST", tmp_path / "dist")
+    monkeypatch.setattr(build, "CATALOGUE_CACHE", tmp_path / "catalogue.pickle")
+    monkeypatch.setattr(build, "HISTORY_DB", tmp_path / "history.sqlite")
+
+    rendered = []
+    render_game = build.render_game
+    monkeypatch.setattr(
+        build, "render_game",
+        lambda game, *a: rendered.append(game["slug"]) or render_game(game, *a),
+    )
+
+    build.main([])
+    build.main(["--incremental"])
+    assert rendered == [slug]
+    assert (build.DIST / "spiel" / slug / "index.html").exists()
+    sitemap = (build.DIST / "sitemap-1.xml").read_text("utf-8")
+    assert f"/spiel/{slug}/" in sitemap and "renamed-file" not in sitemap
+
+
+def test_load_catalogue_reuses_cache_until_file_changes(tmp_path, monkeypatch):
+    import shutil
+    from scripts import build
+
+    content = tmp_path / "games"
+    content.mkdir()
+    src = sorted(build.CONTENT.glob("*.yaml"))[0]
+    target = content / src.name
+    shutil.copy(src, target)
+    monkeypatch.setattr(build, "CONTENT", content)
+    cache = tmp_path / "catalogue.pickle"
+
+    games, _ = build.load_catalogue(cache)
+    assert games[target]["slug"] == src.stem
+    assert cache.exists()
+
+    calls = []
+    load_yaml = build.load_yaml
+    monkeypatch.setattr(build, "load_yaml", lambda p: calls.append(p) or load_yaml(p))
+    assert build.load_catalogue(cache)[0] == games
+    assert calls == []
+
+    target.write_text(target.read_text("utf-8") + "\nextra_field: 1\n", "utf-8")
+    games, _ = build.load_catalogue(cache)
+    assert calls == [target]
+    assert games[target]["extra_field"] == 1
+
+
+def test_append_history_appends_and_replaces_today(tmp_path, monkeypatch):
+    import datetime as dt
+    from scripts import build
+
+    monkeypatch.setattr(build, "HIST_DIR", tmp_path)
+    path = tmp_path / "azul.jsonl"
+    path.write_text('{"date": "2020-01-01", "min": 5.0}\n', "utf-8")
+    today = dt.date.today().isoformat()
+
+    build.append_history("azul", [{"total_eur": 20.0}, {"price_eur": 12.5}])
+    build.append_history("azul", [{"total_eur": 11.0}])
+    build.append_history("azul", [{"total_eur": 11.0}])
+    assert path.read_text("utf-8").splitlines() == [
+        '{"date": "2020-01-01", "min": 5.0}',
+        f'{{"date": "{today}", "min": 11.0}}',
+    ]
+
+
+def test_compact_history_keeps_daily_minimum(tmp_path):
+    from scripts import build
+
+    path = tmp_path / "azul.jsonl"
+    path.write_text(
+        '{"date": "2020-01-02", "min": 9.0}\n'
+        '{"date": "2020-01-01", "min": 8.0}\n'
+        'broken\n'
+        '{"date": "2020-01-02", "min": 7.5}\n',
+        "utf-8",
+    )
+    assert build.compact_history(path) is True
+    assert path.read_text("utf-8") == (
+        '{"date": "2020-01-01", "min": 8.0}\n'
+        '{"date": "2020-01-02", "min": 7.5}\n'
+    )
+    assert build.compact_history(path) is False
+
+
+def test_history_store_aggregates_follow_appends(tmp_path, monkeypatch):
+    import datetime as dt
+    from scripts import build
+
+    monkeypatch.setattr(build, "HIST_DIR", tmp_path)
+    today = dt.date.today()
+    lines = [
+        '{"date": "%s", "min": %s}' % ((today - dt.timedelta(days=d)).isoformat(), v)
+        for d, v in [(40, 30.0), (10, 20.0), (3, 12.0), (1, 10.0)]
+    ]
+    (tmp_path / "azul.jsonl").write_text("\n".join(lines) + "\n", "utf-8")
+
+    store = build.HistoryStore(tmp_path / "history.sqlite")
+    store.sync("azul")
+    stats = store.aggregates("azul", today)
+    assert stats[7] == {"n": 2, "min": 10.0, "avg": 11.0, "p25": 10.5, "p50": 11.0}
+    assert stats[30]["avg"] == 14.0
+    assert stats[60]["n"] == 4
+    assert stats[60]["p50"] == 16.0
+
+    entry = build.append_history("azul", [{"total_eur": 8.0}])
+    store.record("azul", entry)
+    assert store.aggregates("azul", today)[7]["min"] == 8.0
+
+    # the next build appends the same price: cached aggregates are reused
+    rows = store.rows
+    store.rows = lambda *a: pytest.fail("aggregates recomputed")
+    store.sync("azul")
+    store.record("azul", build.append_history("azul", [{"total_eur": 8.0}]))
+    assert store.aggregates("azul", today)[7]["min"] == 8.0
+    store.rows = rows
+    store.close()
+
+    # a fresh checkout only moves the mtime: the cached rows are kept
+    os.utime(tmp_path / "azul.jsonl", ns=(1, 1))
+    store = build.HistoryStore(tmp_path / "history.sqlite")
+    imports = []
+    load_history = build.load_history
+    monkeypatch.setattr(build, "load_history", lambda *a: imports.append(a) or load_history(*a))
+    store.sync("azul")
+    assert imports == []
+    assert store.aggregates("azul", today)[7]["min"] == 8.0
+
+    # files rewritten outside the store (e.g. compaction) are re-imported
+    (tmp_path / "azul.jsonl").write_text(lines[0] + "\n", "utf-8")
+    store.sync("azul")
+    assert len(imports) == 1
+    assert store.aggregates("azul", today)[7]["n"] == 0
+    assert store.rows("azul", today - dt.timedelta(days=60)) == [
+        ((today - dt.timedelta(days=40)).isoformat(), 30.0)
+    ]
+    store.close()
+
+
+def _render_page(tmp_path, monkeypatch, **data):
+    from scripts import build
+
+    monkeypatch.setattr(build, "DIST", tmp_path / "dist")
+    game = build.load_yaml(sorted(build.CONTENT.glob("*.yaml"))[0])
+    stats = {
+        days: {"n": 0, "min": None, "avg": None, "p25": None, "p50": None}
+        for days in (7, 30, 60, 365)
+    }
+    page = {
+        "offers": [{"title": "Spiel", "price_eur": 18.0, "total_eur": 18.0, "url": "https://example.org/1"}],
+        "min_price": 18.0,
+        "fetched_at": None,
+        "history": [],
+        "stats": stats,
+        "analytics": {
+            "trend": None, "percentile": None, "volatility": None,
+            "discount60": None, "deal_score": None, "top_deal": False,
+        },
+    }
+    for key, value in data.items():
+        page[key].update(value)
+    build.render_game(game, "https://example.org", page)
+    return (build.DIST / "spiel" / game["slug"] / "index.html").read_text("utf-8")
+
+
+def test_page_shows_sixty_day_comparison_and_price_stats(tmp_path, monkeypatch):
+    html = _render_page(tmp_path, monkeypatch)
+    assert "price-stats" not in html and "60 Tage" not in html
+
+    window = {"n": 20, "min": 15.0, "avg": 20.0, "p25": 17.0, "p50": 19.5}
+    html = _render_page(tmp_path, monkeypatch, stats={60: window, 365: window})
+    assert "10.0&nbsp;% unter dem Durchschnitt der letzten 60 Tage (20.00&nbsp;€)" in html
+    assert '<table class="price-stats">' in html
+    assert "<th scope=\"row\">60 Tage</th><td>15.00&nbsp;€</td><td>20.00&nbsp;€</td><td>19.50&nbsp;€</td>" in html
+    assert "<th scope=\"row\">7 Tage</th>" not in html
+
+
+def test_page_shows_deal_badges_from_analytics(tmp_path, monkeypatch):
+    html = _render_page(tmp_path, monkeypatch)
+    assert "Top‑Deal" not in html and "bisherigen Tage" not in html
+
+    html = _render_page(tmp_path, monkeypatch, analytics={
+        "percentile": 12.5, "discount60": 23.4, "deal_score": 20.48, "top_deal": True,
+    })
+    assert '<div class="bp-badges" data-deal-score="20.48">' in html
+    assert '<span class="badge badge--best">Top‑Deal: −23% vs. 60‑Tage‑Ø</span>' in html
+    assert "Günstiger als an 88% der bisherigen Tage" in html
+
+
+def test_analyse_prices_scores_whole_catalogue():
+    import numpy as np
+    from scripts import build
+
+    nan = np.nan
+    history = np.full((3, 60), nan)
+    history[0, :] = 20.0              # stable price, now 15 -> top deal
+    history[1, -10:] = [30.0, 32.0] * 5  # volatile, now above Ø7
+    # third game has no history at all
+    result = build.analyse_prices(history, [15.0, 40.0, None])
+
+    assert result[0]["trend"] == "good"
+    assert result[0]["percentile"] == 0.0
+    assert result[0]["discount60"] == 25.0
+    assert result[0]["volatility"] == 0.0
+    assert result[0]["top_deal"] is True
+
+    assert result[1]["trend"] == "high"
+    assert result[1]["percentile"] == 100.0
+    assert result[1]["volatility"] == round(1 / 31, 3)
+    assert result[1]["top_deal"] is False
+
+    assert result[2] == {
+        "trend": None, "percentile": None, "volatility": None,
+        "discount60": None, "deal_score": None, "top_deal": False,
+    }
+
+
+def test_select_relevant_scores_unlabelled_offers_in_one_batch():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from scripts import build
+
+    texts = ["azul brettspiel neu", "azul spiel ovp", "azul sleeves", "azul insert organizer"]
+    vec = TfidfVectorizer().fit(texts)
+    model = LogisticRegression().fit(vec.transform(texts), [1, 1, 0, 0])
+
+    calls = []
+    transform = vec.transform
+    vec.transform = lambda docs: calls.append(len(docs)) or transform(docs)
+
+    loaded = {
+        "azul": (
+            [
+                {"itemId": "1", "title": "azul brettspiel ovp"},
+                {"itemId": "2", "title": "azul sleeves"},
+                {"itemId": "3", "title": "azul organizer insert"},
+            ],
+            {"3": True},
+        ),
+        "catan": ([{"itemId": "9", "title": "azul spiel neu"}, {"title": "no id"}], {}),
+    }
+    result = build.select_relevant(loaded, {"vectorizer": vec, "model": model})
+    assert calls == [3]
+    assert [o["itemId"] for o in result["azul"]] == ["1", "3"]
+    assert [o["itemId"] for o in result["catan"]] == ["9"]
+
+    assert build.select_relevant(loaded, None)["azul"] == [loaded["azul"][0][2]]
+    strict = build.select_relevant(loaded, {"vectorizer": vec, "model": model}, threshold=1.0)
+    assert [o["itemId"] for o in strict["azul"]] == ["3"]
+
+
+def test_copy_public_is_binary_safe_and_fingerprints_assets(tmp_path, monkeypatch):
+    from scripts import build
+
+    public = tmp_path / "public"
+    (public / "img").mkdir(parents=True)
+    (public / "img" / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff\x00")
+    (public / "styles.css").write_text("body {\n  color: red;\n}\n", "utf-8")
+    monkeypatch.setattr(build, "PUBLIC", public)
+    monkeypatch.setattr(build, "DIST", tmp_path / "dist")
+
+    assets = build.copy_public()
+    css = assets["styles.css"]
+    assert css.startswith("styles.") and css.endswith(".css") and css != "styles.css"
+    assert (tmp_path / "dist" / "img" / "logo.png").read_bytes() == b"\x89PNG\r\n\x1a\n\xff\x00"
+    assert (tmp_path / "dist" / css).read_text("utf-8") == "body{color:red}"
+    assert (tmp_path / "dist" / "styles.css").read_text("utf-8").startswith("body {\n")
+
+    copied = []
+    copy_file = build.copy_file
+    monkeypatch.setattr(
+        build, "copy_file", lambda *a, **kw: copied.append(copy_file(*a, **kw))
+    )
+    assert build.copy_public() == assets
+    assert copied == [False, False]
+
+    monkeypatch.setattr(build, "ASSETS", assets)
+    assert build.asset_url("styles.css") == f"/{css}"
+    assert build.asset_url("logo.svg") == "/logo.svg"
+
+
+def test_precompress_skips_unchanged_and_removes_orphans(tmp_path):
+    import gzip
+    from scripts import build
+
+    (tmp_path / "spiel" / "azul").mkdir(parents=True)
+    page = tmp_path / "spiel" / "azul" / "index.html"
+    page.write_text("<p>" + "Azul " * 200 + "</p>", "utf-8")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    (tmp_path / "old.html.gz").write_bytes(b"stale")
+
+    totals = build.precompress(tmp_path)
+    assert totals["files"] == 1 and totals["compressed"] == 1
+    assert totals["gz"] < totals["raw"]
+    gz = tmp_path / "spiel" / "azul" / "index.html.gz"
+    assert gzip.decompress(gz.read_bytes()) == page.read_bytes()
+    assert not (tmp_path / "logo.png.gz").exists()
+    assert not (tmp_path / "old.html.gz").exists()
+
+    assert build.precompress(tmp_path)["compressed"] == 0
+    page.write_text("<p>Azul</p>", "utf-8")
+    assert build.precompress(tmp_path, jobs=2)["compressed"] == 1
+    assert gzip.decompress(gz.read_bytes()) == b"<p>Azul</p>"
+
+
+def test_compress_report_warns_without_brotli(monkeypatch, capsys):
+    from scripts import build
+
+    totals = {"files": 2, "compressed": 1, "raw": 4096, "gz": 1024, "br": 0}
+    monkeypatch.setattr(build, "brotli", None)
+    build.print_compress_report(totals)
+    out = capsys.readouterr().out
+    assert out.count("brotli nicht installiert") == 1
+    assert "gzip 1 KB" in out and ", brotli" not in out
+
+
+def test_minifiers_keep_strings_templates_and_raw_blocks():
+    from scripts import build
+
+    css = '/* x */\na > b ,  c {\n  content: "a  ;  }" ;\n  margin: 0 auto;\n}\n'
+    assert build.minify_css(css) == 'a>b,c{content:"a  ;  }";margin:0 auto}'
+
+    js = "// comment\nfunction f(){\n    const s = `a\n    b`;\n\n    return s; // keep\n}\n"
+    assert build.minify_js(js) == "function f(){\nconst s = `a\n    b`;\nreturn s; // keep\n}"
+
+    html = "<div>\n    <b>a</b>\n    <i>b</i>\n</div>\n<pre>\n  x\n</pre>\n<script>\n  // c\n  go();\n</script>\n"
+    assert build.minify_html(html) == "<div>\n<b>a</b>\n<i>b</i>\n</div>\n<pre>\n  x\n</pre>\n<script>go();</script>\n"
+
+
+def test_search_index_folds_umlauts_and_encodes_filters_as_bitsets():
+    from scripts import build
+
+    def entry(title, players=(None, None), age=None, themes=()):
+        return {"title_short": title, "slug": build.slugify(title), "min_players": players[0],
+                "max_players": players[1], "age": age, "themes": list(themes)}
+
+    games = [
+        entry("Die Quacksalber von Quedlinburg", (2, 4), 10, ["Familie"]),
+        entry("Orléans", (2, 5), 12, ["Strategie"]),
+        entry("Spiel ohne Angaben"),
+    ] + [entry(f"Füller {i}", (1, 1), 8) for i in range(40)]
+    index = build.build_search_index(games)
+
+    assert build.search_tokens("Füße & Käse") == ["fuesse", "fusse", "kaese", "kase"]
+    assert index["tokens"]["orleans"] == [1]
+    assert index["tokens"]["fueller"] == index["tokens"]["fuller"] == list(range(3, 43))
+    assert index["games"][1] == ["Orléans", build.slugify("Orléans")]
+
+    def members(bits):
+        return [i for i in range(len(games)) if bits[i >> 5] >> (i & 31) & 1]
+
+    assert len(index["players"]["5"]) == 2
+    assert members(index["players"]["5"]) == [1]
+    assert members(index["players"]["1"]) == list(range(3, 43))
+    assert [a for a, _ in index["ages"]] == [8, 10, 12]
+    assert members(index["ages"][1][1]) == [0] + list(range(3, 43))
+    assert members(index["themes"]["Strategie"]) == [1]
+
+
+def test_listing_pages_are_paginated_and_stale_pages_removed(tmp_path, monkeypatch):
+    from scripts import build
+
+    monkeypatch.setattr(build, "DIST", tmp_path)
+    raw = [
+        {"title": f"Spiel {i:02d} – Preisradar", "slug": f"spiel-{i:02d}",
+         "players": "2–4" if i % 2 else "1", "themes": ["Strategie"] if i < 3 else []}
+        for i in range(7)
+    ]
+    listing = build.plan_listings(raw, page_size=3)
+    urls = [p["url"] for p in listing["pages"]]
+    assert urls == [
+        "/alle-spiele.html", "/alle-spiele/seite-2.html", "/alle-spiele/seite-3.html",
+        "/spieler/1.html", "/spieler/1/seite-2.html",
+        "/spieler/2.html", "/spieler/3.html", "/spieler/4.html",
+        "/thema/strategie.html",
+    ]
+    second = listing["pages"][1]
+    assert [g["slug"] for g in second["games"]] == ["spiel-03", "spiel-04", "spiel-05"]
+    assert (second["prev"], second["next"]) == ("/alle-spiele.html", "/alle-spiele/seite-3.html")
+    assert listing["pages"][-1]["total"] == 3
+
+    (tmp_path / "thema").mkdir()
+    (tmp_path / "thema" / "alt.html").write_text("stale", "utf-8")
+    build.build_game_list(listing, "https://example.org")
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.html")) == sorted(
+        u.lstrip("/") for u in urls
+    )
+    html = (tmp_path / "alle-spiele" / "seite-2.html").read_text("utf-8")
+    assert '<link rel="prev" href="https://example.org/alle-spiele.html">' in html
+    assert '<link rel="next" href="https://example.org/alle-spiele/seite-3.html">' in html
+    assert 'id="search-index"' in html
+    assert 'id="search-index"' not in (tmp_path / "spieler" / "2.html").read_text("utf-8")
+
+
+def test_sitemap_is_sharded_with_lastmod_and_skips_unchanged_shards(tmp_path, monkeypatch):
+    from scripts import build
+
+    monkeypatch.setattr(build, "DIST", tmp_path)
+    yaml_path = tmp_path / "azul.yaml"
+    yaml_path.write_text("slug: azul\n", "utf-8")
+    assert build.page_lastmod(yaml_path, {"fetched_at": "2025-08-09T08:23:52Z"}) == "2025-08-09T08:23:52+00:00"
+    assert build.page_lastmod(yaml_path, "Traceback ...").startswith(str(build.dt.date.today().year))
+
+    def entries(n, stamp="2025-08-0%d"):
+        for i in range(n):
+            yield f"https://example.org/spiel/s{i}/", stamp % (i % 3 + 1)
+
+    written = build.build_sitemap(entries(5), "https://example.org", max_urls=2)
+    assert written == ["sitemap-1.xml", "sitemap-2.xml", "sitemap-3.xml", "sitemap.xml"]
+    index = (tmp_path / "sitemap.xml").read_text("utf-8")
+    assert "<sitemap><loc>https://example.org/sitemap-2.xml</loc><lastmod>2025-08-03</lastmod></sitemap>" in index
+    assert (tmp_path / "sitemap-3.xml").read_text("utf-8").count("<url>") == 1
+
+    assert build.build_sitemap(entries(5), "https://example.org", max_urls=2) == []
+    changed = build.build_sitemap(
+        (e if i != 2 else (e[0], "2025-09-01") for i, e in enumerate(entries(3))),
+        "https://example.org", max_urls=2,
+    )
+    assert changed == ["sitemap-2.xml", "sitemap.xml"]
+    assert not (tmp_path / "sitemap-3.xml").exists()
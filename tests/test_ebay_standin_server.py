@@ -0,0 +1,48 @@
+import json
+import sys
+import threading
+from pathlib import Path
+
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from scripts import ebay_standin_server
+
+
+def _serve(config):
+    server = ebay_standin_server.make_server(config, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_standin_serves_recorded_search(tmp_path):
+    params = {"q": "Catan", "limit": "50", "filter": "priceCurrency:EUR"}
+    body = {"total": 1, "itemSummaries": [{"itemId": "1"}]}
+    (tmp_path / "a.json").write_text(json.dumps({"params": params, "body": body}), "utf-8")
+    config = ebay_standin_server.StandinConfig(ebay_standin_server.load_recordings(tmp_path))
+    server, base = _serve(config)
+    try:
+        tok = requests.post(base + ebay_standin_server.TOKEN_PATH, data={"grant_type": "x"}, timeout=5)
+        assert tok.json()["access_token"]
+        hit = requests.get(base + ebay_standin_server.SEARCH_PATH, params=params, timeout=5)
+        assert hit.json() == body
+        miss = requests.get(base + ebay_standin_server.SEARCH_PATH, params={"q": "Azul"}, timeout=5)
+        assert miss.json()["itemSummaries"] == []
+        assert (config.hits, config.misses) == (1, 1)
+    finally:
+        server.shutdown()
+
+
+def test_standin_injects_errors():
+    config = ebay_standin_server.StandinConfig({}, throttle_rate=1.0)
+    server, base = _serve(config)
+    try:
+        resp = requests.get(base + ebay_standin_server.SEARCH_PATH, params={"q": "x"}, timeout=5)
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "1"
+        config.throttle_rate, config.error_rate = 0.0, 1.0
+        resp = requests.get(base + ebay_standin_server.SEARCH_PATH, params={"q": "x"}, timeout=5)
+        assert resp.status_code == 503
+    finally:
+        server.shutdown()
@@ -4,6 +4,8 @@ import sys
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import pytest
+
 
 def load_module():
     os.environ.setdefault("EBAY_CLIENT_ID", "dummy")
@@ -13,10 +15,14 @@ def load_module():
         sys.path.insert(0, str(root))
     if "scripts.fetch_offers_ebay_enhanced" in sys.modules:
         del sys.modules["scripts.fetch_offers_ebay_enhanced"]
-    with patch("requests.post") as mock_post:
-        mock_post.return_value.status_code = 200
-        mock_post.return_value.json.return_value = {"access_token": "tok"}
-        return importlib.import_module("scripts.fetch_offers_ebay_enhanced")
+    with patch("requests.Session.post") as mock_post:
+        mod = importlib.import_module("scripts.fetch_offers_ebay_enhanced")
+    # importing must not request a token
+    mock_post.assert_not_called()
+    mod.CLIENT.tokens.path = None
+    mod.CLIENT.tokens.set("tok", 7200)
+    mod.RESPONSE_CACHE = None
+    return mod
 
 
 def test_queries_for_uses_explicit_search_terms_only():
@@ -35,7 +41,7 @@ def test_search_once_adds_filters():
     mod = load_module()
     # ensure location filter can be injected
     mod.FILTER_CFG["item_location_countries"] = ["DE"]
-    with patch("scripts.fetch_offers_ebay_enhanced.requests.get") as mock_get:
+    with patch.object(mod.CLIENT.session, "get") as mock_get:
         mock_resp = MagicMock()
         mock_resp.status_code = 200
         mock_resp.json.return_value = {}
@@ -185,3 +191,340 @@ def test_fetch_for_game_includes_category_in_search_url():
         ]
         offers = mod.fetch_for_game(game)
         assert offers and f"_sacat={mod.DEFAULT_CATEGORY_ID}" in offers[0]["search_url"]
+
+
+def test_fetch_for_game_with_executor_matches_serial():
+    from concurrent.futures import ThreadPoolExecutor
+
+    mod = load_module()
+    game = {"slug": "catan", "search_terms": ["Catan", "Siedler", "Catan Basis"]}
+
+    def fake_search(q, **kwargs):
+        return [
+            {
+                "itemId": f"{q}-{i}",
+                "title": q,
+                "categoryId": mod.DEFAULT_CATEGORY_ID,
+                "price": {"currency": "EUR", "value": str(10 + i)},
+                "conditionId": "1000",
+                "seller": {"username": "shop", "accountType": "BUSINESS"},
+                "itemWebUrl": "http://example.com",
+            }
+            for i in range(3)
+        ]
+
+    with patch("scripts.fetch_offers_ebay_enhanced.search_once", side_effect=fake_search):
+        serial = mod.fetch_for_game(game, max_keep=5)
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            parallel = mod.fetch_for_game(game, max_keep=5, executor=ex)
+    assert parallel == serial
+    assert len(serial) == 5
+
+
+def test_client_uses_pooled_session_for_searches():
+    mod = load_module()
+    adapter = mod.CLIENT.session.get_adapter(mod.SEARCH_URL)
+    assert adapter._pool_maxsize == mod.CLIENT.pool_size
+    mod.CLIENT.resize_pool(16)
+    assert mod.CLIENT.session.get_adapter(mod.SEARCH_URL)._pool_maxsize == 16
+    with patch.object(mod.CLIENT.session, "get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {"itemSummaries": [{"itemId": "1"}]}
+        assert mod.search_once("catan") == [{"itemId": "1"}]
+        _, kwargs = mock_get.call_args
+        assert kwargs["headers"]["Authorization"] == "Bearer tok"
+
+
+def _response(status, headers=None, body=None):
+    resp = MagicMock()
+    resp.status_code = status
+    resp.headers = headers or {}
+    resp.json.return_value = body or {}
+    resp.text = ""
+    return resp
+
+
+def test_search_retries_with_retry_after():
+    mod = load_module()
+    mod.CLIENT.limiter = mod.RateLimiter(1000)
+    with patch.object(mod.CLIENT.session, "get") as mock_get, patch.object(mod.time, "sleep") as mock_sleep:
+        mock_get.side_effect = [
+            _response(429, {"Retry-After": "7"}),
+            _response(503),
+            _response(200, body={"itemSummaries": [{"itemId": "1"}]}),
+        ]
+        assert mod.search_once("catan") == [{"itemId": "1"}]
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    assert delays == [7.0, mod.BACKOFF_BASE_SECONDS * 2]
+    assert mod.CLIENT.stats["retries"] == 2
+    assert mod.CLIENT.stats["throttled"] == 1
+
+
+def test_search_raises_after_retries_and_game_keeps_old_offers():
+    mod = load_module()
+    mod.CLIENT.limiter = mod.RateLimiter(1000)
+    with patch.object(mod.CLIENT.session, "get", return_value=_response(500)), \
+            patch.object(mod.time, "sleep"):
+        offers, error = mod.fetch_game_safe({"slug": "catan", "search_terms": ["Catan"]})
+    assert offers is None
+    assert isinstance(error, mod.SearchError)
+    assert mod.CLIENT.stats["requests"] == mod.MAX_RETRIES + 1
+
+
+def test_daily_budget_stops_requests(tmp_path):
+    mod = load_module()
+    budget = mod.DailyBudget(2, tmp_path / "usage.json")
+    budget.consume()
+    budget.consume()
+    with pytest.raises(mod.BudgetExhausted):
+        budget.consume()
+    budget.save()
+    assert mod.DailyBudget(2, tmp_path / "usage.json").used == 2
+
+
+def test_rate_limiter_spaces_requests():
+    mod = load_module()
+    limiter = mod.RateLimiter(2, burst=1)
+    with patch.object(mod.time, "sleep") as mock_sleep:
+        assert limiter.acquire() == 0
+        waited = limiter.acquire()
+    assert 0.4 < waited <= 0.5
+    mock_sleep.assert_called_once()
+
+
+def test_response_cache_reuses_search_results(tmp_path):
+    mod = load_module()
+    mod.RESPONSE_CACHE = mod.ResponseCache(tmp_path, ttl=3600)
+    with patch.object(mod.CLIENT.session, "get") as mock_get:
+        mock_get.return_value = _response(200, body={"itemSummaries": [{"itemId": "1"}]})
+        first = mod.search_once("azul", category_id="180349")
+        second = mod.search_once("azul", category_id="180349")
+        other = mod.search_once("azul", category_id="1")
+    assert first == second == other == [{"itemId": "1"}]
+    assert mock_get.call_count == 2
+    assert mod.CLIENT.stats["cache_hits"] == 1
+
+
+def test_response_cache_ttl_and_lru(tmp_path):
+    mod = load_module()
+    cache = mod.ResponseCache(tmp_path, ttl=60, max_entries=2)
+    for i in range(3):
+        cache.put({"q": str(i)}, {"itemSummaries": [i]})
+        stamp = 1000 + i
+        os.utime(tmp_path / f"{mod.request_key({'q': str(i)})}.json", (stamp, stamp))
+    with patch.object(mod.time, "time", return_value=1030):
+        cache.get({"q": "0"})  # touch -> most recently used
+        os.utime(tmp_path / f"{mod.request_key({'q': '0'})}.json", (1030, 1030))
+        assert cache.prune() == 1
+    remaining = {p.name for p in tmp_path.glob("*.json")}
+    assert f"{mod.request_key({'q': '1'})}.json" not in remaining
+    assert len(remaining) == 2
+    cache.ttl = 0
+    assert cache.get({"q": "2"}) is None
+
+
+def test_plan_refresh_prefers_volatile_and_stale_games(tmp_path, monkeypatch):
+    import datetime as dt
+    import json
+
+    mod = load_module()
+    offers_dir = tmp_path / "offers"
+    hist_dir = tmp_path / "history"
+    offers_dir.mkdir()
+    hist_dir.mkdir()
+    monkeypatch.setattr(mod, "DATA_DIR", offers_dir)
+    monkeypatch.setattr(mod, "HISTORY_DIR", hist_dir)
+    monkeypatch.setattr(mod, "REFRESH_MIN_HOURS", 1)
+    monkeypatch.setattr(mod, "REFRESH_MAX_HOURS", 24)
+    monkeypatch.setattr(mod, "SEARCH_PAGE_SIZE", 200)
+    monkeypatch.setattr(mod, "MAX_ITEMS_PER_QUERY", 200)
+
+    now = dt.datetime(2025, 9, 10, 12, 0)
+    today = dt.date.today()
+
+    def write(slug, hours_ago, prices):
+        ts = (now - dt.timedelta(hours=hours_ago)).isoformat() + "Z"
+        (offers_dir / f"{slug}.json").write_text(json.dumps({"fetched_at": ts, "offers": []}))
+        lines = [
+            json.dumps({"date": (today - dt.timedelta(days=len(prices) - i)).isoformat(), "min": p})
+            for i, p in enumerate(prices)
+        ]
+        (hist_dir / f"{slug}.jsonl").write_text("\n".join(lines) + "\n")
+
+    write("hot", 2, [10, 12, 9, 11, 13])     # moves daily -> 1 h interval
+    write("calm", 2, [20, 20, 20, 20, 20])   # stable -> 24 h interval
+    write("old", 30, [30, 30, 30])           # stable but overdue
+    games = [
+        {"slug": "calm", "search_terms": ["a"]},
+        {"slug": "hot", "search_terms": ["a", "b"]},
+        {"slug": "new", "search_terms": ["a", "b", "c"]},
+        {"slug": "old", "search_terms": ["a"]},
+    ]
+    planned = mod.plan_refresh(games, now=now)
+    assert [g["slug"] for g in planned] == ["hot", "new", "old"]
+    # never-fetched games win a tight budget first, then the most overdue
+    planned = mod.plan_refresh(games, call_budget=4, now=now)
+    assert [g["slug"] for g in planned] == ["new", "old"]
+    # an exhausted budget plans nothing instead of everything
+    assert mod.plan_refresh(games, call_budget=0, now=now) == []
+
+    # every query is charged for all pages it may request
+    monkeypatch.setattr(mod, "MAX_ITEMS_PER_QUERY", 400)
+    assert mod.calls_per_query() == 2
+    planned = mod.plan_refresh(games, call_budget=4, now=now)
+    assert [g["slug"] for g in planned] == ["hot"]
+
+
+def _item(iid, price=10):
+    return {
+        "itemId": iid,
+        "title": "Catan",
+        "categoryId": "180349",
+        "price": {"currency": "EUR", "value": str(price)},
+        "conditionId": "1000",
+        "seller": {"username": "shop", "accountType": "BUSINESS"},
+        "itemWebUrl": "http://example.com",
+    }
+
+
+def test_fetch_for_game_pages_lazily_until_enough_offers(monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, "SEARCH_PAGE_SIZE", 2)
+    game = {"slug": "catan", "search_terms": ["Catan", "Siedler"], "ebay_category_id": "180349"}
+
+    def fake_search(q, limit=200, offset=0, **kwargs):
+        return [_item(f"{q}-{offset + i}", 10 + offset + i) for i in range(limit)]
+
+    with patch("scripts.fetch_offers_ebay_enhanced.search_once", side_effect=fake_search) as mock_search:
+        offers = mod.fetch_for_game(game, max_keep=3)
+    assert [o["id"] for o in offers] == ["Catan-0", "Catan-1", "Catan-2"]
+    offsets = [c.kwargs.get("offset", 0) for c in mock_search.call_args_list]
+    assert offsets == [0, 2]
+
+
+def test_search_pages_stops_on_short_page():
+    mod = load_module()
+    pages = {0: [1, 2], 2: [3]}
+    with patch(
+        "scripts.fetch_offers_ebay_enhanced.search_once",
+        side_effect=lambda q, limit, offset=0, **kw: pages[offset],
+    ) as mock_search:
+        assert list(mod.search_pages("catan", page_size=2, max_items=10)) == [[1, 2], [3]]
+    assert mock_search.call_count == 2
+
+
+def test_offer_filter_reports_rejection_reason():
+    mod = load_module()
+    flt = mod.OfferFilter("180349", ["seefahrer"])
+    assert flt.reason(_item("1")) is None
+    assert flt.reason({**_item("2"), "categoryId": "1"}) == "category"
+    assert flt.reason({**_item("3"), "title": "Catan Seefahrer"}) == "exclude:seefahrer"
+    assert flt.reason({**_item("4"), "title": "Catan Expansion Pack"}) == "exclude:expansion pack"
+    assert flt.reason({**_item("5"), "conditionId": "3000", "condition": "Gebraucht"}) == "condition"
+    assert flt.reason({**_item("6"), "conditionId": "3000", "condition": "Neu: Sonstige"}) is None
+    assert flt.reason({**_item("7"), "seller": {"accountType": "INDIVIDUAL"}}) == "seller"
+    assert mod.looks_like_accessory("Catan Sleeves") is True
+    assert mod.looks_like_accessory("Catan", ["seefahrer"]) is False
+
+
+def test_token_provider_caches_token_on_disk(tmp_path):
+    mod = load_module()
+    session = MagicMock()
+    session.post.return_value = _response(200, body={"access_token": "t1", "expires_in": 7200})
+    path = tmp_path / "token.json"
+    first = mod.TokenProvider(session, "id", "secret", path=path)
+    assert first.get() == "t1"
+    assert first.get() == "t1"
+    # a new process reuses the cached token without another OAuth call
+    second = mod.TokenProvider(session, "id", "secret", path=path)
+    assert second.get() == "t1"
+    assert session.post.call_count == 1
+    # other credentials do not pick up the cached token
+    session.post.return_value = _response(200, body={"access_token": "t2", "expires_in": 7200})
+    assert mod.TokenProvider(session, "other", "secret", path=path).get() == "t2"
+
+
+def test_token_provider_refreshes_expired_token(tmp_path):
+    mod = load_module()
+    session = MagicMock()
+    session.post.side_effect = [
+        _response(200, body={"access_token": "old", "expires_in": 100}),
+        _response(200, body={"access_token": "new", "expires_in": 7200}),
+    ]
+    tokens = mod.TokenProvider(session, "id", "secret", path=tmp_path / "t.json", margin=300)
+    assert tokens.get() == "old"
+    assert tokens.get() == "new"
+
+
+def test_search_refreshes_token_on_401():
+    mod = load_module()
+    mod.CLIENT.limiter = mod.RateLimiter(1000)
+    with patch.object(mod.CLIENT.session, "get") as mock_get, \
+            patch.object(mod.CLIENT.session, "post") as mock_post:
+        mock_post.return_value = _response(200, body={"access_token": "fresh", "expires_in": 7200})
+        mock_get.side_effect = [
+            _response(401),
+            _response(200, body={"itemSummaries": [{"itemId": "1"}]}),
+        ]
+        assert mod.search_once("catan") == [{"itemId": "1"}]
+    auths = [c.kwargs["headers"]["Authorization"] for c in mock_get.call_args_list]
+    assert auths == ["Bearer tok", "Bearer fresh"]
+
+
+def test_shards_partition_catalogue_and_verify(tmp_path, monkeypatch):
+    import datetime as dt
+
+    mod = load_module()
+    monkeypatch.setattr(mod, "SHARD_DIR", tmp_path)
+    games = [{"slug": f"game-{i}"} for i in range(20)]
+    parts = [mod.select_games(games, shard=(i, 3)) for i in range(3)]
+    assert sorted(g["slug"] for p in parts for g in p) == sorted(g["slug"] for g in games)
+    assert mod.select_games(games, shard=(1, 3)) == parts[1]
+    assert mod.select_games(games, slugs=["game-2", "nope"]) == [{"slug": "game-2"}]
+
+    assert len(mod.verify_shards(3, games)) == 3
+    for i, p in enumerate(parts[:2]):
+        mod.write_shard_manifest(i, 3, done=[g["slug"] for g in p], failed=[])
+    problems = mod.verify_shards(3, games)
+    assert problems and "Shard 2/3" in problems[0]
+    mod.write_shard_manifest(2, 3, done=[g["slug"] for g in parts[2]][1:], failed=[])
+    assert "in keinem Shard" in mod.verify_shards(3, games)[0]
+    mod.write_shard_manifest(2, 3, done=[g["slug"] for g in parts[2]], failed=[])
+    assert mod.verify_shards(3, games) == []
+
+    # failed games are holes unless explicitly allowed
+    mod.write_shard_manifest(2, 3, done=[g["slug"] for g in parts[2]][1:], failed=[parts[2][0]["slug"]])
+    assert "fehlgeschlagen" in mod.verify_shards(3, games)[0]
+    assert mod.verify_shards(3, games, allow_failed=True) == []
+
+    # manifests from another run (or too old without a run id) are rejected
+    for i, p in enumerate(parts):
+        mod.write_shard_manifest(i, 3, done=[g["slug"] for g in p], failed=[], run_id="41")
+    assert mod.verify_shards(3, games, run_id="41") == []
+    problems = mod.verify_shards(3, games, run_id="42")
+    assert len(problems) == 3 and "Lauf 41" in problems[0]
+    later = dt.datetime.utcnow() + dt.timedelta(hours=mod.SHARD_MAX_AGE_HOURS + 1)
+    assert all("veraltet" in p for p in mod.verify_shards(3, games, now=later))
+
+
+def test_record_then_replay_without_network(tmp_path):
+    mod = load_module()
+    mod.RECORDER = mod.Recording(tmp_path)
+    try:
+        with patch.object(mod.CLIENT.session, "get") as mock_get:
+            mock_get.return_value = _response(200, body={"itemSummaries": [_item("1")]})
+            recorded = mod.fetch_for_game({"slug": "catan", "search_terms": ["Catan"]})
+    finally:
+        mod.RECORDER = None
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    mod.REPLAY = mod.Recording(tmp_path)
+    try:
+        with patch.object(mod.CLIENT.session, "get") as mock_get:
+            replayed = mod.fetch_for_game({"slug": "catan", "search_terms": ["Catan"]})
+            missing = mod.search_once("Azul")
+        mock_get.assert_not_called()
+    finally:
+        mod.REPLAY = None
+    assert replayed == recorded and len(recorded) == 1
+    assert missing == []
@@ -25,3 +25,97 @@ def test_load_dataset_skips_non_dict(tmp_path, monkeypatch):
     texts, labels = train_relevance_model.load_dataset()
     assert len(texts) == 1
     assert labels == [1]
+
+
+def test_streaming_training_updates_with_new_labels_only(tmp_path, monkeypatch):
+    offers_dir = tmp_path / "offers"
+    labels_dir = tmp_path / "labels"
+    offers_dir.mkdir()
+    labels_dir.mkdir()
+    offers = [
+        {"itemId": "1", "title": "Azul Brettspiel neu"},
+        {"itemId": "2", "title": "Azul Sleeves Kartenhüllen"},
+        {"itemId": "3", "title": "Azul Spiel OVP"},
+    ]
+    (offers_dir / "azul.json").write_text(json.dumps({"offers": offers}), "utf-8")
+    (labels_dir / "azul.json").write_text(json.dumps({"1": True, "2": False}), "utf-8")
+    monkeypatch.setattr(train_relevance_model, "OFFERS_DIR", offers_dir)
+    monkeypatch.setattr(train_relevance_model, "LABEL_DIR", labels_dir)
+
+    bundle, n = train_relevance_model.train_streaming(batch_size=1)
+    assert n == 2
+    hashes = bundle["trained"]["hashes"]
+    assert hashes.dtype == "uint64"
+    assert sorted(hashes.tolist()) == sorted(
+        train_relevance_model.example_hash(k) for k in ("azul:1:1", "azul:2:0")
+    )
+    assert set(bundle["trained"]["files"]) == {"azul"}
+
+    # unchanged files are not read again
+    reads = []
+    iter_examples = train_relevance_model.iter_examples
+    monkeypatch.setattr(
+        train_relevance_model, "iter_examples",
+        lambda files: reads.append(list(files)) or iter_examples(files),
+    )
+    assert train_relevance_model.train_streaming(bundle)[1] == 0
+    assert reads == [[]]
+
+    (labels_dir / "azul.json").write_text(
+        json.dumps({"1": True, "2": False, "3": True}), "utf-8"
+    )
+    bundle, n = train_relevance_model.train_streaming(bundle)
+    assert n == 1
+    assert len(bundle["trained"]["hashes"]) == 3
+    X = bundle["vectorizer"].transform(["Azul Brettspiel OVP"])
+    assert bundle["model"].predict_proba(X).shape == (1, 2)
+
+
+def test_streaming_training_shuffles_with_a_seed(tmp_path, monkeypatch):
+    offers_dir = tmp_path / "offers"
+    labels_dir = tmp_path / "labels"
+    offers_dir.mkdir()
+    labels_dir.mkdir()
+    for slug, relevant in (("azul", True), ("catan", False)):
+        offers = [{"itemId": str(i), "title": f"{slug} {i}"} for i in range(20)]
+        (offers_dir / f"{slug}.json").write_text(json.dumps(offers), "utf-8")
+        labels = {str(i): relevant for i in range(20)}
+        (labels_dir / f"{slug}.json").write_text(json.dumps(labels), "utf-8")
+    monkeypatch.setattr(train_relevance_model, "OFFERS_DIR", offers_dir)
+    monkeypatch.setattr(train_relevance_model, "LABEL_DIR", labels_dir)
+
+    batches = []
+    partial_fit = train_relevance_model.SGDClassifier.partial_fit
+
+    def spy(self, X, y, **kw):
+        batches.append(list(y))
+        return partial_fit(self, X, y, **kw)
+
+    monkeypatch.setattr(train_relevance_model.SGDClassifier, "partial_fit", spy)
+    first, n = train_relevance_model.train_streaming(batch_size=8, epochs=2, seed=1)
+    assert n == 40
+    assert len(batches) == 10
+    # batches mix both games instead of following the file order
+    assert any(0 < sum(b) < len(b) for b in batches)
+    assert batches[:5] != batches[5:]
+
+    order = batches[:]
+    batches.clear()
+    second, _ = train_relevance_model.train_streaming(batch_size=8, epochs=2, seed=1)
+    assert batches == order
+    assert (first["model"].coef_ == second["model"].coef_).all()
+
+
+def test_evaluate_reports_quality_and_cost():
+    texts = [f"azul brettspiel neu {i}" for i in range(6)] + [
+        f"azul sleeves zubehör {i}" for i in range(6)
+    ]
+    y = [1] * 6 + [0] * 6
+    for streaming in (False, True):
+        report = train_relevance_model.evaluate(texts, y, streaming=streaming, folds=3)
+        assert report["folds"] == 3
+        assert report["examples"] == 12
+        assert 0 <= report["precision"] <= 1 and 0 <= report["recall"] <= 1
+        assert report["offers_per_second"] > 0
+        assert report["model_bytes"] > 0
+    assert train_relevance_model.evaluate(texts[:7], y[:7]) is None